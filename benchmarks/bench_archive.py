@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metar
+from bench_encode_batch import random_observations
+from src.history.reader import read_history, format_timestamp
+from src.history.archive import ObservationArchive
+
+def write_history(path: str, n_lines: int) -> None:
+    # encoder output for one report every 30 minutes at the 20/50 slots
+    first = datetime(2015, 1, 1, 0, 20, tzinfo=timezone.utc)
+    slots = np.datetime64(first.replace(tzinfo=None), "m") + np.arange(n_lines) * np.timedelta64(30, "m")
+    reports = metar.encode_batch(**random_observations(n_lines), timestamps=slots)
+    with open(path, "w") as f:
+        for i, report in enumerate(reports):
+            saved_at = (first + timedelta(minutes=30*i, seconds=20)).astimezone().replace(tzinfo=None)
+            f.write(f"{format_timestamp(saved_at)}: {report}\n")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        text_path = os.path.join(folder, "report_history.txt")
+        write_history(text_path, args.lines)
+
+        archive = ObservationArchive(os.path.join(folder, "archive"))
+        start = time.perf_counter()
+        archive.import_text_history(text_path)
+        print(f"import + append: {len(archive):,} reports in {time.perf_counter()-start:.2f} s")
+
+        # mean temperature per station over the whole history
+        start = time.perf_counter()
+        sums, counts = defaultdict(float), defaultdict(int)
+        for record in read_history(text_path, decode=True):
+            sums[record.report.station_identifier] += record.report.temperature
+            counts[record.report.station_identifier] += 1
+        text_elapsed = time.perf_counter() - start
+
+        archive = ObservationArchive(os.path.join(folder, "archive"))
+        start = time.perf_counter()
+        station, temperature = archive["station"], archive["temperature"]
+        with np.errstate(invalid="ignore"):
+            means = np.bincount(station, weights=temperature) / np.bincount(station)
+        archive_elapsed = time.perf_counter() - start
+
+        assert all(abs(means[archive.code("station", s)] - sums[s]/counts[s]) < 1e-6 for s in sums)
+        print(f"mean temperature per station, text scan: {text_elapsed*1e3:10.1f} ms")
+        print(f"mean temperature per station, memmap:    {archive_elapsed*1e3:10.1f} ms ({text_elapsed/archive_elapsed:,.0f}x)")
+
+        start = time.perf_counter()
+        year = archive.time_slice(datetime(2016, 1, 1), datetime(2016, 12, 31, 23, 59))
+        cavok_share = archive["cavok"][year].mean()
+        print(f"CAVOK share in 2016 ({year.stop-year.start:,} reports): {cavok_share:.1%} in {(time.perf_counter()-start)*1e3:.2f} ms")
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import statistics
+import multiprocessing as mp
+
+import miniaudio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sound import Sound, SOUND_LANA, soundPath, soundStateInit, soundQueueInit, requestSound, requestSoundShutdown
+
+N_PLAYBACKS = 5
+BURST = 20
+
+class ReportingSound(Sound):
+    # sends the player statistics back instead of only logging them
+    def __init__(self, guiState, soundState, soundQueue, results):
+        super().__init__(guiState, soundState, soundQueue, silence=True, nullSink=True)
+        self.results = results
+
+    def shutdown(self):
+        player = self.players[SOUND_LANA]
+        self.results.put((player.latencies, player.triggered, player.coalesced))
+        super().shutdown()
+
+def runReportingSound(guiState, soundState, soundQueue, results):
+    sound = ReportingSound(guiState, soundState, soundQueue, results)
+    sound.run()
+    sound.shutdown()
+
+if __name__ == '__main__':
+    mp.set_start_method('spawn')
+
+    start = time.perf_counter()
+    decoded = miniaudio.decode_file(soundPath(SOUND_LANA))
+    print(f"decoding {SOUND_LANA}.mp3 (paid on every trigger by playsound): {(time.perf_counter()-start)*1e3:.1f} ms, "
+          f"duration {decoded.duration:.2f} s")
+
+    guiState, soundState = {'shutdown': False}, soundStateInit({})
+    soundQueue, results = soundQueueInit(), mp.Queue()
+    p = mp.Process(target=runReportingSound, args=(guiState, soundState, soundQueue, results))
+    p.start()
+    time.sleep(1.0)     # let the process decode and open the null device
+
+    for _ in range(N_PLAYBACKS):
+        requestSound(soundQueue)
+        time.sleep(decoded.duration + 0.1)
+    for _ in range(BURST):      # rapid clicks while the sound is playing
+        requestSound(soundQueue)
+        time.sleep(0.01)
+    requestSoundShutdown(soundQueue)
+    latencies, triggered, coalesced = results.get()
+    p.join()
+
+    print(f"play() -> first samples to the device (null sink): median {statistics.median(latencies)*1e3:.1f} ms, "
+          f"max {max(latencies)*1e3:.1f} ms over {len(latencies)} playbacks")
+    print(f"{triggered} requests, {coalesced} coalesced into a running playback")
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import random
+import timeit
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metar
+from src.utils.logger import CLOG
+from src.utils.stage_timing import STAGE_TIMINGS
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "components.json")
+THRESHOLD = 0.20        # a component regresses when it is more than 20% slower than its baseline
+N_FIXTURES = 600
+
+# ---------------------------------------------------------------------------
+# Fixtures: one generator per kind of weather, each returns get_report_from_gui arguments
+
+def _cloud_layer(rng: random.Random, crowd: str, low: int, high: int) -> dict:
+    return {"crowd": crowd, "height": rng.randrange(low, high, 10), "thundercloud": rng.choice(["", "", "", "TCU", "CB"])}
+
+def _observation(rng: random.Random, **changes) -> dict:
+    altitude = rng.choice([0, 410, 564, 1000, 1580])
+    dry_temperature = round(rng.uniform(-5, 25), 1)
+    observation = dict(type_of_report=rng.choice(["METAR", "MET1"]),
+                       station_identifier=rng.choice(metar.VALID_STATION_IDENTIFIER),
+                       station_altitude=altitude,
+                       force=rng.randint(3, 20), direction_left=rng.randint(0, 359), gusts=None,
+                       prevailing_distance=rng.choice([4000, 6000, 8000, 9000]),
+                       smallest_distance=0, smallest_direction="",
+                       weather_phenomena=rng.choice(["", "", "RA", "-RA", "BR"]),
+                       cloud_list=sorted([_cloud_layer(rng, rng.choice(["FEW", "SCT", "BKN", "OVC"]), altitude + 100, altitude + 2000)
+                                          for _ in range(rng.randint(1, 3))], key=lambda c: c["height"]),
+                       dry_temperature=dry_temperature,
+                       wet_temperature=round(dry_temperature - rng.uniform(0, 4), 1),
+                       QFE=rng.randint(840, 1030))
+    observation["direction_right"] = (observation["direction_left"] + rng.randint(0, 50)) % 360
+    observation.update(changes)
+    while len(observation["cloud_list"]) < 3:
+        observation["cloud_list"].append({"crowd": "", "height": 0, "thundercloud": ""})
+    return observation
+
+def calm(rng):
+    return _observation(rng, force=0, direction_right=0)
+
+def variable(rng):
+    left = rng.randint(0, 359)
+    return _observation(rng, force=rng.randint(1, 2), direction_left=left, direction_right=(left + rng.randint(60, 170)) % 360)
+
+def gusty(rng):
+    force = rng.randint(12, 35)
+    return _observation(rng, force=force, gusts=force + rng.randint(10, 25))
+
+def cavok(rng):
+    return _observation(rng, prevailing_distance=10000, weather_phenomena="", cloud_list=[])
+
+def low_ceiling(rng):
+    altitude = rng.choice([410, 564, 1000])
+    return _observation(rng, station_altitude=altitude, prevailing_distance=rng.choice([0, 500, 1200, 2000]),
+                        smallest_distance=rng.choice([0, 300, 600]), smallest_direction=rng.choice(["N", "SW", "E"]),
+                        weather_phenomena=rng.choice(["FG", "BR", "-DZ"]),
+                        cloud_list=[_cloud_layer(rng, "BKN", altitude, altitude + 200), _cloud_layer(rng, "OVC", altitude + 200, altitude + 600)])
+
+def freezing(rng):
+    dry_temperature = round(rng.uniform(-25, -0.1), 1)
+    return _observation(rng, dry_temperature=dry_temperature, wet_temperature=round(dry_temperature - rng.uniform(0, 2), 1),
+                        weather_phenomena=rng.choice(["", "-SN", "SN"]))
+
+SCENARIOS = [calm, variable, gusty, cavok, low_ceiling, freezing]
+
+def observation_fixtures(n: int = N_FIXTURES, seed: int = 0) -> list:
+    # the scenarios interleaved, so every component sees each kind of weather equally often
+    rng = random.Random(seed)
+    return [SCENARIOS[i % len(SCENARIOS)](rng) for i in range(n)]
+
+# ---------------------------------------------------------------------------
+# Components
+
+COMPONENTS = {
+    "Wind": lambda o: metar.Wind(force=o["force"], direction_left=o["direction_left"], direction_right=o["direction_right"], gusts=o["gusts"]),
+    "Visibility": lambda o: metar.Visibility(prevailing_distance=o["prevailing_distance"], smallest_distance=o["smallest_distance"],
+                                             smallest_direction=o["smallest_direction"]),
+    "Clouds": lambda o: metar.Clouds(cloud_list=o["cloud_list"]),
+    "Temperature_and_DewPoint": lambda o: metar.Temperature_and_DewPoint(dry_temperature=o["dry_temperature"], wet_temperature=o["wet_temperature"],
+                                                                         airPressure=o["QFE"]),
+    "AirPressure": lambda o: metar.AirPressure(QFE=o["QFE"], station_altitude=o["station_altitude"]),
+    "get_ColorCode": lambda o: metar.get_ColorCode(o["station_altitude"], o["prevailing_distance"], o["cloud_list"]),
+    "get_UTC_Date_and_Time": lambda o: metar.get_UTC_Date_and_Time(),
+    "get_report_from_gui": lambda o: metar.get_report_from_gui(**o),
+    "get_report_from_gui_cached": lambda o: metar.get_report_from_gui(**o),
+}
+# Every pass repeats the same fixtures, so metar.SEGMENT_CACHE would time cache hits from the second
+# pass on: the components run without it, these with it, emptied before every pass
+SEGMENT_CACHED = {"get_report_from_gui_cached"}
+
+def per_call_us(component, fixtures: list, repeat: int = 7, before_pass=None) -> float:
+    # best of `repeat` passes over all fixtures, in microseconds per call
+    def run():
+        if before_pass is not None:
+            before_pass()
+        for o in fixtures:
+            component(o)
+    return min(timeit.repeat(run, repeat=repeat, number=1)) / len(fixtures) * 1e6
+
+def run_suite(names=None, repeat: int = 7, seed: int = 0) -> dict:
+    fixtures = observation_fixtures(seed=seed)
+    enabled = metar.SEGMENT_CACHE.enabled
+    results = {}
+    try:
+        for name in (names or COMPONENTS):
+            if name in SEGMENT_CACHED:
+                metar.SEGMENT_CACHE.enable()
+                results[name] = per_call_us(COMPONENTS[name], fixtures, repeat, before_pass=metar.SEGMENT_CACHE.clear)
+            else:
+                metar.SEGMENT_CACHE.disable()
+                results[name] = per_call_us(COMPONENTS[name], fixtures, repeat)
+    finally:
+        if enabled:
+            metar.SEGMENT_CACHE.enable()
+    return results
+
+def save_baseline(results: dict, path: str = BASELINE_PATH) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {"python": platform.python_version(), "machine": platform.machine(), "us_per_call": results}
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)["us_per_call"]
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD) -> list:
+    # names of the components more than `threshold` slower than their baseline (new components are skipped)
+    return [name for name, us in results.items() if name in baseline and us > baseline[name] * (1 + threshold)]
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    for name, us in results.items():
+        line = f"{name:<26} {us:8.2f} us/call"
+        if baseline and name in baseline:
+            line += f"   baseline {baseline[name]:8.2f} us  {us/baseline[name] - 1:+7.1%}"
+        print(line)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-component encoder micro-benchmarks")
+    parser.add_argument('command', choices=['run', 'save', 'compare'], nargs='?', default='run',
+                        help="run: print timings, save: store them as the baseline, compare: fail on regression")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--only', nargs='+', choices=list(COMPONENTS), help="benchmark these components only")
+    parser.add_argument('--stages', action='store_true', help="also print the per-stage timing of get_report_from_gui")
+    args = parser.parse_args()
+
+    if args.stages:
+        STAGE_TIMINGS.enable()
+        for o in observation_fixtures():
+            metar.get_report_from_gui(**o)
+        STAGE_TIMINGS.log(CLOG(processName="STAGES"))
+        STAGE_TIMINGS.disable()
+
+    results = run_suite(args.only, args.repeat)
+    if args.command == 'save':
+        save_baseline(results, args.baseline)
+        print_results(results)
+        print(f"baseline saved to {args.baseline}")
+    elif args.command == 'compare':
+        baseline = load_baseline(args.baseline)
+        print_results(results, baseline)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"REGRESSION beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"no regression beyond {args.threshold:.0%}")
+    else:
+        print_results(results)
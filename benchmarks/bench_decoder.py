@@ -0,0 +1,23 @@
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metar
+from bench_encode_batch import random_observations
+
+N_LINES = 1_000_000
+
+if __name__ == '__main__':
+    reports = metar.encode_batch(**random_observations(N_LINES))
+    lines = [r + "\n" for r in reports]
+
+    # streaming: decoded reports are consumed and dropped, as when reading a history file
+    start = time.perf_counter()
+    deque(metar.parse_many(lines), maxlen=0)
+    elapsed = time.perf_counter() - start
+    print(f"parse_many: {N_LINES:,} lines in {elapsed:.2f} s ({N_LINES/elapsed:,.0f} lines/s)")
+
+    mismatches = sum(metar.get_report_from_decoded(d) != r for d, r in zip(metar.parse_many(lines), reports))
+    print(f"round-trip mismatches: {mismatches}")
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metar
+
+N_LAYERS = 3
+
+def random_observations(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    crowd = rng.choice(["", "FEW", "SCT", "BKN", "OVC"], size=(n, N_LAYERS))
+    thundercloud = rng.choice(["", "", "", "TCU", "CB"], size=(n, N_LAYERS))
+    dry_temperature = np.round(rng.uniform(-20, 35, n), 1)
+    return dict(type_of_report=rng.choice(["METAR", "MET1"], n),
+                station_identifier=rng.choice(metar.VALID_STATION_IDENTIFIER, n),
+                station_altitude=rng.integers(0, 2000, n),
+                force=np.where(rng.random(n) < 0.1, 0, rng.integers(0, 40, n)),
+                direction_left=rng.integers(0, 360, n),
+                direction_right=rng.integers(0, 360, n),
+                gusts=rng.integers(0, 60, n),
+                prevailing_distance=rng.integers(0, 12000, n),
+                smallest_distance=rng.integers(0, 8000, n),
+                smallest_direction=rng.choice(["", "N", "S", "E", "W", "NE", "NW", "SE", "SW"], n),
+                weather_phenomena=rng.choice(["", "", "", "RA", "-SN", "BR"], n),
+                cloud_crowd=crowd,
+                cloud_height=rng.integers(0, 6000, (n, N_LAYERS)),
+                cloud_thundercloud=thundercloud,
+                dry_temperature=dry_temperature,
+                wet_temperature=np.round(dry_temperature - rng.uniform(0, 4, n), 1),
+                QFE=rng.integers(900, 1040, n))
+
+def row(columns: dict, i: int) -> dict:
+    r = {k: v[i].item() for k, v in columns.items() if not k.startswith("cloud_")}
+    r["cloud_list"] = [{"crowd": columns["cloud_crowd"][i, j], "height": columns["cloud_height"][i, j].item(),
+                        "thundercloud": columns["cloud_thundercloud"][i, j]} for j in range(N_LAYERS)]
+    return r
+
+def check_identical(columns: dict, n: int) -> int:
+    batch = metar.encode_batch(**{k: v[:n] for k, v in columns.items()})
+    return sum(metar.get_report_from_gui(**row(columns, i)) != batch[i] for i in range(n))
+
+if __name__ == '__main__':
+    columns = random_observations(1_000_000)
+    print(f"mismatches vs get_report_from_gui on 10k rows: {check_identical(columns, 10_000)}")
+
+    start = time.perf_counter()
+    for i in range(10_000):
+        metar.get_report_from_gui(**row(columns, i))
+    print(f"{'scalar':>8} {10_000:>9} rows: {10_000/(time.perf_counter()-start):12,.0f} reports/s")
+
+    for n in [10_000, 100_000, 1_000_000]:
+        subset = {k: v[:n] for k, v in columns.items()}
+        start = time.perf_counter()
+        metar.encode_batch(**subset)
+        print(f"{'batch':>8} {n:>9} rows: {n/(time.perf_counter()-start):12,.0f} reports/s")
@@ -0,0 +1,54 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.history.reader import read_history, read_history_reversed, last_reports, format_timestamp
+
+def write_synthetic_history(path: str, size_bytes: int) -> tuple:
+    # one report every 10 minutes, going back from now
+    report = "METAR LSMC 181250Z 04004KT 010V080 9999 FEW033 SCT066 BKN130 01/M07 Q1011 BLU"
+    n_lines = size_bytes // (len(format_timestamp(datetime.now())) + 2 + len(report) + 1)
+    first = datetime.now().replace(microsecond=0) - timedelta(minutes=10*n_lines)
+    chunk = 100_000
+    with open(path, "w") as f:
+        for i in range(0, n_lines, chunk):
+            f.write("".join(f"{format_timestamp(first + timedelta(minutes=10*j))}: {report}\n" for j in range(i, min(i+chunk, n_lines))))
+    return first, n_lines
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-gb", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "report_history.txt")
+        first, n_lines = write_synthetic_history(path, int(args.size_gb * 1024**3))
+        print(f"history: {os.path.getsize(path)/1024**2:,.0f} MB, {n_lines:,} lines, peak RSS after writing {peak_rss_mb():.0f} MB")
+
+        start = time.perf_counter()
+        records = last_reports(path, 100)
+        print(f"last 100 reports:            {(time.perf_counter()-start)*1e3:10.2f} ms")
+
+        day = first + timedelta(minutes=10*n_lines//2)
+        start = time.perf_counter()
+        n_day = sum(1 for _ in read_history(path, start=day, end=day + timedelta(days=1)))
+        print(f"one day in the middle:       {(time.perf_counter()-start)*1e3:10.2f} ms ({n_day} records)")
+
+        start = time.perf_counter()
+        n_week = sum(1 for _ in read_history_reversed(path, start=datetime.now() - timedelta(days=7)))
+        print(f"last week, newest first:     {(time.perf_counter()-start)*1e3:10.2f} ms ({n_week} records)")
+
+        start = time.perf_counter()
+        deque(read_history(path), maxlen=0)
+        elapsed = time.perf_counter() - start
+        print(f"full forward scan:           {elapsed:10.2f} s ({n_lines/elapsed:,.0f} lines/s)")
+        print(f"peak RSS: {peak_rss_mb():.0f} MB")
@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.history.reader import read_history, format_timestamp
+from src.history.store import HistoryStore
+
+STATIONS = ["LSMC", "LSZH", "LSGG", "LSZB", "LSMA"]
+
+def write_station_history(path: str, n_lines: int) -> datetime:
+    # reports every 30 minutes at the 20/50 slots, cycling through STATIONS
+    first = datetime(2020, 1, 1, 0, 20, tzinfo=timezone.utc)
+    with open(path, "w") as f:
+        for i in range(n_lines):
+            slot = first + timedelta(minutes=30*(i // len(STATIONS)))
+            saved_at = slot.astimezone().replace(tzinfo=None) + timedelta(seconds=30)
+            f.write(f"{format_timestamp(saved_at)}: METAR {STATIONS[i % len(STATIONS)]} {slot:%d%H%M}Z 04004KT 9999 FEW033 01/M07 Q1011 BLU\n")
+    return first
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        text_path = os.path.join(folder, "report_history.txt")
+        first = write_station_history(text_path, args.lines)
+
+        with HistoryStore(os.path.join(folder, "report_history.sqlite")) as store:
+            start = time.perf_counter()
+            imported = store.import_text_history(text_path)
+            elapsed = time.perf_counter() - start
+            print(f"import: {imported:,} reports in {elapsed:.2f} s ({imported/elapsed:,.0f} reports/s)")
+
+            day = first + timedelta(minutes=30*(args.lines // len(STATIONS) // 2))
+            start = time.perf_counter()
+            n = sum(1 for _ in store.query(station="LSZH", start=day, end=day + timedelta(days=1)))
+            print(f"store, one station one day:  {(time.perf_counter()-start)*1e3:10.2f} ms ({n} reports)")
+
+            start = time.perf_counter()
+            n = sum(1 for _ in read_history(text_path) if " LSZH " in _.report
+                    and day <= _.timestamp.astimezone(timezone.utc) <= day + timedelta(days=1))
+            print(f"text file full scan:         {(time.perf_counter()-start)*1e3:10.2f} ms ({n} reports)")
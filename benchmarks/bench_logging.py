@@ -0,0 +1,59 @@
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import contextlib
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.logger import CLOG, LogListener, attachLogQueue, DEBUG, INFO
+
+N_MESSAGES = 20_000
+
+def per_call_us(cl: CLOG, level: int) -> float:
+    start = time.perf_counter()
+    for i in range(N_MESSAGES):
+        cl.log("report %d encoded in %.1f us", i, 12.5, level=level)
+    return (time.perf_counter() - start) / N_MESSAGES * 1e6
+
+def runProducer(logQueue, name: str, n: int) -> None:
+    attachLogQueue(logQueue)
+    cl = CLOG(processName=name)
+    for i in range(n):
+        cl.info("message %d", i)
+
+if __name__ == '__main__':
+    mp.set_start_method('spawn')
+    cl = CLOG(processName="BENCH", timed=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        printed = per_call_us(cl, INFO)
+    print(f"{'print (to a buffer)':<26} {printed:8.2f} us/call in the logging thread")
+    print(f"{'below level (DEBUG)':<26} {per_call_us(cl, DEBUG):8.2f} us/call")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "log.jsonl")
+        logQueue = mp.Queue()
+        listener = LogListener(logQueue, path)
+        attachLogQueue(logQueue)
+        print(f"{'queued':<26} {per_call_us(cl, INFO):8.2f} us/call in the logging thread")
+
+        producers = [mp.Process(target=runProducer, args=(logQueue, name, N_MESSAGES)) for name in ("GUI", "SOUND")]
+        start = time.perf_counter()
+        for p in producers:
+            p.start()
+        for p in producers:
+            p.join()
+        listener.close()
+        elapsed = time.perf_counter() - start
+        attachLogQueue(None)
+
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        per_process = {}
+        for r in records:
+            per_process.setdefault(r["process"], []).append(int(r["msg"].split()[-1]) if r["process"] != "BENCH" else 0)
+        in_order = all(v == sorted(v) for v in per_process.values())
+        print(f"listener wrote {len(records)} records ({listener.written}) from {sorted(per_process)} "
+              f"in order per process: {in_order}, 2x{N_MESSAGES} from children in {elapsed:.2f} s")
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metar
+from src.engine.multi_station import MultiStationEngine
+from bench_encode_batch import random_observations, row
+
+STATIONS = list(dict.fromkeys(metar.VALID_STATION_IDENTIFIER))
+
+def slot_observations(n_slots: int, seed: int = 0) -> list:
+    # every station once per slot, in station order
+    columns = random_observations(n_slots * len(STATIONS), seed)
+    observations = [row(columns, i) for i in range(n_slots * len(STATIONS))]
+    for i, observation in enumerate(observations):
+        observation["type_of_report"] = "METAR"
+        observation["station_identifier"] = STATIONS[i % len(STATIONS)]
+    return observations
+
+def slot_times(reports: list) -> set:
+    # the DDHHMMZ groups of the reports, one per bulletin
+    return {report.split()[2] for report in reports}
+
+def worker_counts() -> list:
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cores:
+        counts.append(counts[-1] * 2)
+    return counts + [cores] if cores > 1 else counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Multi-station engine throughput from 1 to all cores")
+    parser.add_argument('--slots', type=int, default=5_000)
+    args = parser.parse_args()
+
+    observations = slot_observations(args.slots)
+    with MultiStationEngine(workers=1) as engine:
+        print(engine.bulletin(observations[:len(STATIONS)], heading="METAR bulletin, first slot"))
+        start = time.perf_counter()
+        serial = engine.encode(observations)
+        serial_s = time.perf_counter() - start
+
+    print(f"{len(observations)} observations ({len(STATIONS)} stations x {args.slots} slots)")
+    for workers in worker_counts():
+        with MultiStationEngine(workers=workers, min_parallel=0) as engine:
+            engine.encode(observations[:len(STATIONS)])    # start the pool outside of the measurement
+            start = time.perf_counter()
+            reports = engine.encode(observations)
+            elapsed = time.perf_counter() - start
+        print(f"{workers:>3} workers {len(observations)/elapsed:12,.0f} reports/s  x{serial_s/elapsed:5.2f} vs in-process, "
+              f"same order and reports: {reports == serial}, one slot time: {len(slot_times(reports)) == 1}")
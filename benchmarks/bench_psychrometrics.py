@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metar
+from src.utils.psychrometrics import dew_point, relative_humidity
+
+N_SAMPLES = 1_000_000
+N_OBJECTS = 100_000     # the per-object path is timed on a subset and scaled up
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    dry_temperature = rng.uniform(-20, 35, N_SAMPLES)
+    wet_temperature = dry_temperature - rng.uniform(0, 6, N_SAMPLES)
+    QFE = rng.uniform(900, 1040, N_SAMPLES)
+
+    start = time.perf_counter()
+    dew = dew_point(dry_temperature, wet_temperature, QFE)
+    humidity = relative_humidity(dry_temperature, wet_temperature, QFE)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_object = [metar.Temperature_and_DewPoint(dry_temperature=d, wet_temperature=w, airPressure=p).dewPoint
+                  for d, w, p in zip(dry_temperature[:N_OBJECTS].tolist(), wet_temperature[:N_OBJECTS].tolist(), QFE[:N_OBJECTS].tolist())]
+    per_object_time = (time.perf_counter() - start) * N_SAMPLES / N_OBJECTS
+
+    assert np.allclose(np.array(per_object), dew[:N_OBJECTS], rtol=1e-12, atol=1e-12, equal_nan=True)
+    print(f"samples: {N_SAMPLES:,} ({np.isnan(dew).sum():,} without a dew point, median RH {np.nanmedian(humidity):.1f}%)")
+    print(f"vectorized dew point + RH: {vectorized*1e3:10.1f} ms")
+    print(f"per-object dew point:      {per_object_time*1e3:10.1f} ms (extrapolated from {N_OBJECTS:,})")
+    print(f"speedup: {per_object_time/vectorized:.0f}x")
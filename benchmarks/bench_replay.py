@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.engine.stream_encode import read_observations
+from src.engine.replay import replay, format_results
+from bench_encode_batch import random_observations, row
+from bench_multi_station import STATIONS
+
+SPEEDS = [1_000, 10_000, 100_000, 1_000_000, 10_000_000, 0]
+
+def write_session(path: str, hours: float, every_minutes: int = 1, seed: int = 0) -> int:
+    # every station observed every `every_minutes` minutes, as JSON lines
+    steps = int(hours * 60 / every_minutes)
+    columns = random_observations(steps * len(STATIONS), seed)
+    start = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(steps * len(STATIONS)):
+            observation = row(columns, i)
+            observation["type_of_report"] = "METAR"
+            observation["station_identifier"] = STATIONS[i % len(STATIONS)]
+            observation["observation_time"] = (start + timedelta(minutes=every_minutes * (i // len(STATIONS)))).isoformat()
+            f.write(json.dumps(observation) + "\n")
+    return steps * len(STATIONS)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay a synthetic session at increasing speeds to find where reports get dropped")
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--speeds', type=float, nargs="+", default=SPEEDS, help="0 is as fast as possible")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        session = os.path.join(folder, "session.jsonl")
+        n = write_session(session, args.hours)
+        print(f"session: {n} observations, {len(STATIONS)} stations, {args.hours} h")
+        for speed in args.speeds:
+            history = os.path.join(folder, f"history_{speed:g}")
+            os.mkdir(history)
+            with open(session, encoding="utf-8") as f:
+                results = replay(read_observations(f), speed, history)
+            print(f"\n--- {'as fast as possible' if not speed else f'{speed:,.0f}x'}\n{format_results(results)}")
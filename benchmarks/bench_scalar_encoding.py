@@ -0,0 +1,122 @@
+import os
+import sys
+import timeit
+from contextlib import contextmanager
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metar
+from metar import string_zero_padding
+from src.utils.psychrometrics import dew_point
+
+CLOUD_LIST = [{"crowd": "FEW", "height": 1000, "thundercloud": ""},
+              {"crowd": "SCT", "height": 2000, "thundercloud": "TCU"},
+              {"crowd": "BKN", "height": 4000, "thundercloud": ""}]
+
+CASES = {
+    "Wind": lambda: metar.Wind(force=14, direction_left=10, direction_right=80, gusts=26),
+    "Visibility": lambda: metar.Visibility(prevailing_distance=6500, smallest_distance=1200, smallest_direction="SW"),
+    "Clouds": lambda: metar.Clouds(cloud_list=CLOUD_LIST),
+    "Temperature_and_DewPoint": lambda: metar.Temperature_and_DewPoint(dry_temperature=1.3, wet_temperature=-1.5, airPressure=949),
+    "AirPressure": lambda: metar.AirPressure(QFE=949, station_altitude=564),
+    "get_report_from_gui": lambda: metar.get_report_from_gui(type_of_report="METAR", station_identifier="LSMC", station_altitude=564,
+                                                             force=4, direction_left=10, direction_right=80, gusts=None,
+                                                             prevailing_distance=10000, smallest_distance=3000, smallest_direction="SW",
+                                                             weather_phenomena="",
+                                                             cloud_list=CLOUD_LIST,
+                                                             dry_temperature=1.3, wet_temperature=-1.5,
+                                                             QFE=949),
+}
+
+# ---------------------------------------------------------------------------
+# "before": the NumPy-scalar code replaced by builtin math, swapped back into metar by numpy_scalars()
+
+class NumpyWind(metar.Wind):
+    def __post_init__(self) -> None:
+        self.direction_left = np.mod(round(float(self.direction_left)/10)*10,360)
+        self.direction_right = np.mod(round(self.direction_right/10)*10,360)
+
+        if (self.direction_left <= self.direction_right):
+            self.direction_mean = round(((self.direction_left + self.direction_right)/2)/10)*10
+            self.direction_diff = self.direction_right - self.direction_left
+        else:
+            self.direction_mean = round((((self.direction_left-360) + self.direction_right)/2)/10)*10
+            self.direction_diff = self.direction_right - (self.direction_left-360)
+
+        self.report_string = " "
+        if (self.force == 0):
+            self.direction_mean = 0
+            self.report_string += string_zero_padding(string=str(np.mod(round(self.direction_mean/10)*10,360)), total_length=3)
+            self.report_string += string_zero_padding(string=str(self.force), total_length=2)
+            self.report_string += "KT"
+        elif (self.force > 99 or (self.gusts is not None and self.gusts > 99)):
+            self.report_string += "P99"
+        elif (60 <= self.direction_diff and self.direction_diff < 180 and self.force < 3) or self.direction_diff >= 180:
+            self.report_string += "VRB" + string_zero_padding(string=str(self.force), total_length=2) + "KT"
+        else:
+            self.report_string += string_zero_padding(string=str(np.mod(round(self.direction_mean/10)*10,360)), total_length=3)
+            self.report_string += string_zero_padding(string=str(self.force), total_length=2)
+            if ((self.gusts is not None) and (self.gusts >= self.force + 10)):
+                self.report_string += "G" + string_zero_padding(string=str(self.gusts), total_length=2)
+            self.report_string += "KT"
+
+            if (60 <= self.direction_diff and self.direction_diff < 180 and self.force >= 3):
+                self.report_string += " " + string_zero_padding(string=str(self.direction_left), total_length=3) + "V" + string_zero_padding(string=str(self.direction_right), total_length=3)
+
+def numpy_floor_visibility(dist: int) -> int:
+    if (0 <= dist and dist < 800):
+        dist = int(np.floor(dist/50)*50)
+    elif (800 <= dist and dist < 5000):
+        dist = int(np.floor(dist/100)*100)
+    elif (5000 <= dist and dist < 10000):
+        dist = int(np.floor(dist/1000)*1000)
+    dist = np.minimum(dist, 9999)
+    return dist
+
+def numpy_round_cloud_height(height: int) -> int:
+    if (0 <= height and height < 10000):
+        height = int(np.floor(height/100)*100)
+    elif (10000 <= height and height < 43000):
+        height = int(np.floor(height/1000)*1000)
+    height = np.minimum(height, 43000)
+    return height
+
+def numpy_dew_point(dry_temperature, wet_temperature, air_pressure) -> float:
+    return float(dew_point(dry_temperature, wet_temperature, air_pressure))
+
+NUMPY_SCALAR_VERSIONS = {"Wind": NumpyWind, "floor_visibility": numpy_floor_visibility,
+                         "round_cloud_height": numpy_round_cloud_height, "scalar_dew_point": numpy_dew_point}
+
+@contextmanager
+def numpy_scalars():
+    current = {name: getattr(metar, name) for name in NUMPY_SCALAR_VERSIONS}
+    for name, version in NUMPY_SCALAR_VERSIONS.items():
+        setattr(metar, name, version)
+    try:
+        yield
+    finally:
+        for name, version in current.items():
+            setattr(metar, name, version)
+
+def report_strings() -> dict:
+    return {name: func() if name == "get_report_from_gui" else func().report_string for name, func in CASES.items()}
+
+def per_call_latency(func, repeat: int = 5) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+if __name__ == '__main__':
+    # the same input over and over: with metar.SEGMENT_CACHE every call after the first is a cache hit
+    metar.SEGMENT_CACHE.disable()
+    with numpy_scalars():
+        before = {name: per_call_latency(func) for name, func in CASES.items()}
+        before_strings = report_strings()
+    after = {name: per_call_latency(func) for name, func in CASES.items()}
+    print(f"{'us/report':<26} {'NumPy scalars':>14} {'builtin math':>14}")
+    for name in CASES:
+        print(f"{name:<26} {before[name]*1e6:14.2f} {after[name]*1e6:14.2f}   x{before[name]/after[name]:5.2f}")
+    print(f"same strings: {before_strings == report_strings()}")
+    metar.SEGMENT_CACHE.enable()
+    print(f"{'get_report_from_gui_cached':<26} {'':>14} {per_call_latency(CASES['get_report_from_gui'])*1e6:14.2f}")
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metar
+
+STATIONS = {"LSMC": 564, "LSZB": 510, "LSMM": 1000, "LSGS": 482}
+
+def replayed_history(n_slots: int, seed: int = 0) -> list:
+    # the observations of a few stations every 30 min: each field drifts slowly from slot to slot,
+    # like a real report history (wind veering a few degrees, cloud bases moving 30 m, ...)
+    rng = random.Random(seed)
+    state = {station: dict(force=8, direction=240, gusts=None, prevailing_distance=9000, smallest_distance=0,
+                           weather_phenomena="", crowd=["FEW", "BKN", ""], height=[altitude + 600, altitude + 1200, 0],
+                           dry_temperature=12.0, depression=2.0, QFE=1013 - round(altitude * 3.3 / 30))
+             for station, altitude in STATIONS.items()}
+    observations = []
+    for _ in range(n_slots):
+        for station, altitude in STATIONS.items():
+            s = state[station]
+            if rng.random() < 0.3:
+                s["force"] = max(0, min(40, s["force"] + rng.choice([-2, -1, 1, 2])))
+            if rng.random() < 0.3:
+                s["direction"] = (s["direction"] + rng.choice([-20, -10, 10, 20])) % 360
+            s["gusts"] = s["force"] + rng.randint(10, 15) if s["force"] > 15 and rng.random() < 0.5 else None
+            if rng.random() < 0.1:
+                s["prevailing_distance"] = rng.choice([3000, 6000, 9000, 10000, 10000])
+                s["weather_phenomena"] = "" if s["prevailing_distance"] >= 9000 else rng.choice(["BR", "-RA"])
+            if rng.random() < 0.2:
+                s["height"] = [max(altitude + 30, h + rng.choice([-30, 30])) if h else 0 for h in s["height"]]
+            if rng.random() < 0.05:
+                s["crowd"] = [rng.choice(["", "FEW", "SCT", "BKN"]), rng.choice(["", "BKN", "OVC"]), ""]
+            if rng.random() < 0.5:
+                s["dry_temperature"] = round(s["dry_temperature"] + rng.choice([-0.5, 0.5]), 1)
+            if rng.random() < 0.2:
+                s["depression"] = round(max(0.0, s["depression"] + rng.choice([-0.5, 0.5])), 1)
+            if rng.random() < 0.2:
+                s["QFE"] += rng.choice([-1, 1])
+            observations.append(dict(type_of_report="METAR", station_identifier=station, station_altitude=altitude,
+                                     force=s["force"], direction_left=s["direction"] - 10, direction_right=s["direction"] + 10,
+                                     gusts=s["gusts"], prevailing_distance=s["prevailing_distance"],
+                                     smallest_distance=s["smallest_distance"], smallest_direction="",
+                                     weather_phenomena=s["weather_phenomena"],
+                                     cloud_list=[{"crowd": c, "height": h, "thundercloud": ""} for c, h in zip(s["crowd"], s["height"])],
+                                     dry_temperature=s["dry_temperature"], wet_temperature=round(s["dry_temperature"] - s["depression"], 1),
+                                     QFE=s["QFE"]))
+    return observations
+
+def encode_all(observations: list) -> tuple:
+    start = time.perf_counter()
+    reports = [metar.get_report_from_gui(**o) for o in observations]
+    return reports, time.perf_counter() - start
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Segment cache hit rate and speedup on a replayed history")
+    parser.add_argument('--slots', type=int, default=20_000, help="30 min slots per station")
+    args = parser.parse_args()
+
+    observations = replayed_history(args.slots)
+    metar.SEGMENT_CACHE.disable()
+    uncached, uncached_s = encode_all(observations)
+    metar.SEGMENT_CACHE.enable()
+    metar.SEGMENT_CACHE.clear()
+    cached, cached_s = encode_all(observations)
+
+    n = len(observations)
+    print(f"{n} reports, identical: {cached == uncached}")
+    print(f"uncached {n/uncached_s:10,.0f} reports/s, cached {n/cached_s:10,.0f} reports/s, speedup x{uncached_s/cached_s:.2f}")
+    for name, s in metar.SEGMENT_CACHE.stats().items():
+        print(f"{name:<12} hit rate {s['hit_rate']:6.1%} ({s['hits']} hits, {s['misses']} misses, {s['currsize']} entries)")
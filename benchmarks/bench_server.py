@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from bench_components import observation_fixtures
+
+PORT = 8799
+
+def start_server(max_batch: int, max_delay_ms: float, unix_path: str = None) -> subprocess.Popen:
+    args = [sys.executable, "-m", "src.server.encode_server", "--max-batch", str(max_batch), "--max-delay-ms", str(max_delay_ms)]
+    args += ["--unix", unix_path] if unix_path else ["--port", str(PORT)]
+    server = subprocess.Popen(args, cwd=ROOT, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            if unix_path:
+                socket.socket(socket.AF_UNIX).connect(unix_path)
+            else:
+                socket.create_connection(("127.0.0.1", PORT)).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+async def client(requests: list, latencies: list, unix_path: str = None) -> None:
+    # one keep-alive connection, one request at a time
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    for body in requests:
+        start = time.perf_counter()
+        writer.write(b"POST /encode HTTP/1.1\r\nHost: metar\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        json.loads(await reader.readexactly(length))["report"]
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+async def load(n_requests: int, concurrency: int, unix_path: str = None) -> tuple:
+    bodies = [json.dumps(o).encode() for o in observation_fixtures(n_requests)]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(bodies[i::concurrency], latencies, unix_path) for i in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load generator for src/server/encode_server.py")
+    parser.add_argument('--requests', type=int, default=20_000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--unix', action='store_true', help="over a Unix socket instead of TCP")
+    args = parser.parse_args()
+
+    for title, max_batch, max_delay_ms in [("no batching", 1, 0), ("batching", 512, 0), ("batching, 1 ms wait", 512, 1.0)]:
+        with tempfile.TemporaryDirectory() as folder:
+            unix_path = os.path.join(folder, "metar.sock") if args.unix else None
+            server = start_server(max_batch, max_delay_ms, unix_path)
+            try:
+                asyncio.run(load(200, 8, unix_path))     # warm-up
+                latencies, elapsed = asyncio.run(load(args.requests, args.concurrency, unix_path))
+                stats = None if unix_path else json.load(urllib.request.urlopen(f"http://127.0.0.1:{PORT}/stats"))
+            finally:
+                server.terminate()
+                server.wait()
+        print(f"{title:<20} {len(latencies)/elapsed:9,.0f} requests/s, p50 {percentile(latencies, 50)*1e3:7.2f} ms, "
+              f"p99 {percentile(latencies, 99)*1e3:7.2f} ms ({args.concurrency} connections)"
+              + (f", {stats['encoded']/stats['batches']:.1f} reports/batch" if stats else ""))
@@ -0,0 +1,49 @@
+import os
+import sys
+import timeit
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.shared_state import SharedState
+
+GUI_STATE_LAYOUT = {'shutdown': bool, 'getReportClicked': bool, 'metarReport': (str, 512)}
+REPORT = "METAR LSMC 181950Z 04004KT 010V080 9999 3000SW FEW033 SCT066 BKN130 01/M07 Q1011 BLU"
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+def access_latencies(state) -> dict:
+    state['shutdown'] = False
+    state['metarReport'] = REPORT
+    cases = {
+        "read flag": lambda: state['shutdown'],
+        "write flag": lambda: state.__setitem__('getReportClicked', True),
+        "read report": lambda: state['metarReport'],
+        "write report": lambda: state.__setitem__('metarReport', REPORT),
+    }
+    results = {}
+    for name, func in cases.items():
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        results[name] = min(timer.repeat(repeat=3, number=number)) / number
+    return results
+
+if __name__ == '__main__':
+    manager = mp.Manager()
+    manager_state = manager.dict()
+    shared_state = SharedState(GUI_STATE_LAYOUT)
+
+    manager_latencies = access_latencies(manager_state)
+    shared_latencies = access_latencies(shared_state)
+    print(f"{'':<14} {'Manager dict':>14} {'SharedState':>14}")
+    for name in manager_latencies:
+        print(f"{name:<14} {manager_latencies[name]*1e6:11.2f} us {shared_latencies[name]*1e6:11.2f} us")
+    print(f"resident memory: Manager server process {rss_kb(manager._process.pid)/1024:.1f} MB, "
+          f"shared state block {shared_state.size} bytes (no extra process)")
+
+    shared_state.close()
+    manager.shutdown()
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import statistics
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sound import Sound, soundStateInit, soundQueueInit, requestSound, requestSoundShutdown
+
+N_REQUESTS = 50
+
+class LatencySound(Sound):
+    # reports the wakeup latency instead of playing the file
+    def __init__(self, guiState, soundState, soundQueue, results):
+        super().__init__(guiState, soundState, soundQueue, silence=True, nullSink=True)
+        self.results = results
+
+    def play(self, name):
+        self.results.put(self.latency)
+
+def runLatencySound(guiState, soundState, soundQueue, results):
+    sound = LatencySound(guiState, soundState, soundQueue, results)
+    sound.run()
+    sound.shutdown()
+
+def runPollingSound(guiState, soundState, results):
+    # the previous design: poll Manager proxies every 200 ms
+    while True:
+        if soundState['Lana']:
+            soundState['Lana'] = False
+            results.put(time.monotonic() - soundState['requested_at'])
+        time.sleep(0.2)
+        if guiState['shutdown']:
+            break
+
+def summary(name: str, latencies: list, shutdown: float) -> None:
+    latencies = sorted(latencies)
+    print(f"{name:<8} request->wakeup median {statistics.median(latencies)*1e3:8.2f} ms, "
+          f"max {latencies[-1]*1e3:8.2f} ms, shutdown {shutdown*1e3:8.2f} ms")
+
+if __name__ == '__main__':
+    mp.set_start_method('spawn')
+    with mp.Manager() as manager:
+        guiState, soundState = manager.dict(), manager.dict()
+        guiState['shutdown'] = False
+        soundStateInit(soundState)
+        results = mp.Queue()
+
+        p = mp.Process(target=runPollingSound, args=(guiState, soundState, results))
+        p.start()
+        latencies = []
+        for _ in range(N_REQUESTS // 5):
+            soundState['requested_at'] = time.monotonic()
+            soundState['Lana'] = True
+            latencies.append(results.get())
+            time.sleep(0.05)
+        start = time.monotonic()
+        guiState['shutdown'] = True
+        p.join()
+        summary("polling", latencies, time.monotonic() - start)
+
+        soundQueue = soundQueueInit()
+        p = mp.Process(target=runLatencySound, args=(guiState, soundState, soundQueue, results))
+        p.start()
+        requestSound(soundQueue)    # wait until the process is up
+        results.get()
+        latencies = []
+        for _ in range(N_REQUESTS):
+            requestSound(soundQueue)
+            latencies.append(results.get())
+            time.sleep(0.05)
+        start = time.monotonic()
+        requestSoundShutdown(soundQueue)
+        p.join()
+        summary("queue", latencies, time.monotonic() - start)
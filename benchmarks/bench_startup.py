@@ -0,0 +1,85 @@
+import time
+LAUNCH_TIME = time.time()
+
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+import importlib.util
+import multiprocessing as mp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (start method, SOUND process started at launch)
+MODES = [('spawn', True), ('forkserver', True), ('forkserver', False)]
+FIRST_PAINT = re.compile(r"First paint (\d+) ms after launch")
+
+# what the GUI and SOUND processes import, without the Qt window itself
+CHILD_MODULES = ['numpy', 'miniaudio', 'metar', 'sound', 'src.history.writer']
+
+def runChild(results, name):
+    for module in CHILD_MODULES:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+    results.put((name, time.time()))
+
+def childrenReady(method: str, eagerSound: bool) -> float:
+    # launch -> GUI child ready (and SOUND child ready when eager), in milliseconds
+    if method == 'forkserver':
+        mp.set_forkserver_preload(CHILD_MODULES)
+    mp.set_start_method(method)
+    results = mp.Queue()
+    processes = [mp.Process(target=runChild, args=(results, 'GUI'))]
+    if eagerSound:
+        processes.append(mp.Process(target=runChild, args=(results, 'SOUND')))
+    for p in processes:
+        p.start()
+    ready = max(results.get()[1] for _ in processes)
+    for p in processes:
+        p.join()
+    return (ready - LAUNCH_TIME) * 1e3
+
+def measureChildren(method: str, eagerSound: bool) -> float:
+    # every measurement in a fresh interpreter, the start method can be set once per process
+    args = [sys.executable, os.path.abspath(__file__), '--child', method] + (['--eager-sound'] if eagerSound else [])
+    return float(subprocess.run(args, capture_output=True, text=True, check=True).stdout)
+
+def measureApplication(method: str, eagerSound: bool) -> float:
+    args = [sys.executable, os.path.join(ROOT, 'main.py'), '--start-method', method, '--exit-after-first-paint']
+    if eagerSound:
+        args.append('--eager-sound')
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    out = subprocess.run(args, capture_output=True, text=True, env=env, cwd=ROOT, timeout=60).stdout
+    match = FIRST_PAINT.search(out)
+    if match is None:
+        raise RuntimeError("no first paint reported:\n" + out)
+    return float(match.group(1))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Launch time per multiprocessing start mode")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--child', choices=['spawn', 'forkserver'], help=argparse.SUPPRESS)
+    parser.add_argument('--eager-sound', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(childrenReady(args.child, args.eager_sound))
+        sys.exit(0)
+
+    measures = [("children ready", measureChildren)]
+    if importlib.util.find_spec('PyQt5') is not None:
+        measures.append(("first paint", measureApplication))
+    else:
+        print("PyQt5 not installed, measuring child process startup only")
+
+    for title, measure in measures:
+        for method, eagerSound in MODES:
+            times = [measure(method, eagerSound) for _ in range(args.repeat)]
+            sound = "eager" if eagerSound else "lazy"
+            print(f"{title:<15} {method:<10} sound {sound:<5} median {statistics.median(times):7.1f} ms, "
+                  f"min {min(times):7.1f} ms")
@@ -0,0 +1,76 @@
+import os
+import io
+import sys
+import csv
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metar
+from src.engine.stream_encode import read_observations, encode_stream, INT_FIELDS, FLOAT_FIELDS, STRING_FIELDS
+from bench_encode_batch import random_observations, row, N_LAYERS
+
+CHUNK_SIZES = [1, 3, 300, 2048]
+
+def csv_session(n: int, empty_fraction: float = 0.1, seed: int = 0, observation_time=None) -> str:
+    # random observations as CSV, with empty cells (missing values) among the optional and measured fields,
+    # all made at observation_time if given (an observation_time column), else encoded at the clock
+    columns = random_observations(n, seed)
+    rng = random.Random(seed)
+    out = io.StringIO()
+    names = list(INT_FIELDS + FLOAT_FIELDS + STRING_FIELDS) + \
+            [f"cloud{i}_{field}" for i in range(1, N_LAYERS + 1) for field in ("crowd", "height", "thundercloud")]
+    if observation_time is not None:
+        names.append("observation_time")
+    writer = csv.DictWriter(out, fieldnames=names)
+    writer.writeheader()
+    for i in range(n):
+        observation = row(columns, i)
+        cells = {name: observation[name] for name in INT_FIELDS + FLOAT_FIELDS + STRING_FIELDS}
+        for j, layer in enumerate(observation["cloud_list"], 1):
+            cells.update({f"cloud{j}_crowd": layer["crowd"], f"cloud{j}_height": layer["height"], f"cloud{j}_thundercloud": layer["thundercloud"]})
+        r = rng.random()
+        if r < empty_fraction:
+            cells["dry_temperature"] = cells["wet_temperature"] = ""
+        elif r < 2 * empty_fraction:
+            cells["dry_temperature"] = cells["wet_temperature"] = cells["QFE"] = ""
+        if rng.random() < 0.5:
+            cells["smallest_distance"] = ""
+        if rng.random() < 0.3:
+            cells["gusts"] = ""
+        if observation_time is not None:
+            cells["observation_time"] = observation_time.isoformat()
+        writer.writerow(cells)
+    return out.getvalue()
+
+def check_identical(session: str, chunk_size: int, workers: int = 1) -> int:
+    # mismatches between the streamed reports and get_report_from_gui on every row, in order
+    streamed = list(encode_stream(read_observations(io.StringIO(session)), workers=workers, chunk_size=chunk_size))
+    expected = [metar.get_report_from_gui(**o) for o in read_observations(io.StringIO(session))]
+    return sum(a != b for a, b in zip(streamed, expected)) + abs(len(streamed) - len(expected))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Streaming encoder: same reports as get_report_from_gui at any chunk size, and throughput")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=2, help="pool size of the order check")
+    args = parser.parse_args()
+
+    # one clock reading for the whole check, the reports must not straddle a slot
+    now = metar.wall_clock()
+    metar.set_clock(lambda: now)
+    check = csv_session(3_000)
+    for chunk_size in CHUNK_SIZES:
+        print(f"chunk size {chunk_size:>5}: {check_identical(check, chunk_size)} mismatches vs get_report_from_gui "
+              f"on 3000 rows with empty cells")
+    # the pool workers do not share set_clock under every start method: the rows carry their time
+    timed = csv_session(3_000, seed=1, observation_time=now)
+    for chunk_size in CHUNK_SIZES:
+        print(f"chunk size {chunk_size:>5}, {args.workers} workers: {check_identical(timed, chunk_size, args.workers)} "
+              f"mismatches (order or report) vs get_report_from_gui on 3000 rows")
+
+    session = csv_session(args.rows)
+    start = time.perf_counter()
+    n = sum(1 for _ in encode_stream(read_observations(io.StringIO(session))))
+    print(f"{n} rows: {n/(time.perf_counter()-start):12,.0f} rows/s")
+    metar.set_clock(None)
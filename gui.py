@@ -1,18 +1,33 @@
 import os
 import sys
+import time
 from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog, QMessageBox
 from PyQt5.QtCore import Qt, QObject, QThread, QMutex, pyqtSignal, QTimer, QSettings
-from multiprocessing import Manager
-from src.utils.logger import CLOG
+from src.utils.logger import CLOG, attachLogQueue
+from src.utils.shared_state import SharedState
 from src.gui_setup.MainWindow import Ui_MainWindow
-import yaml
 import pyperclip
 import metar
-from sound import soundStateInit
+from src.utils.stage_timing import STAGE_TIMINGS
+from src.stations.catalog import station_catalog
+from sound import soundStateInit, soundQueueInit, requestSound, requestSoundShutdown
+from src.history.writer import HistoryWriter
+from src.engine.scheduler import SlotScheduler, timer_ms
 
-def runGUI(guiState, soundState, silence):
+HISTORY_BACKEND = "text"    # "text" appends to report_history.txt, "sqlite" to the indexed report_history.sqlite
+STAGE_TIMING = False        # time the stages of every report, the summary is logged at shutdown
+LIVE_PREVIEW = False        # show the report while the inputs are edited, without saving it or playing the sound
+PREVIEW_DEBOUNCE_MS = 8     # edits closer together than this are previewed once, well within a 60 Hz frame
+PREVIEW_STYLE = "color: gray; font-style: italic;"     # a preview is not an issued report, it must not look like one
+SLOT_SCHEDULER = False      # report and save the current inputs at every slot (20 and 50 past the hour) without GET REPORT
+
+def runGUI(guiState, soundState, soundQueue, silence, launchTime=None, exitAfterFirstPaint=False, logQueue=None):
+    # launchTime: time.time() when the application was launched, the first paint is reported against it
+    # logQueue: log through the LogListener of the launcher instead of printing
+    if logQueue is not None:
+        attachLogQueue(logQueue)
     app = QApplication(sys.argv)
-    mainwindow = MainWindow(guiState, soundState, silence)
+    mainwindow = MainWindow(guiState, soundState, soundQueue, silence, launchTime=launchTime, exitAfterFirstPaint=exitAfterFirstPaint)
     mainwindow.cl.log('Starting up')
     # widget = QStackedWidget()
     # widget.addWidget(mainwindow)
@@ -23,14 +38,20 @@ def runGUI(guiState, soundState, silence):
         mainwindow.shutdown()
         sys.exit(0)
 
-def guiStateInit(guiState):
+GUI_STATE_LAYOUT = {'shutdown': bool, 'getReportClicked': bool, 'metarReport': (str, 512)}
+
+def guiStateInit(guiState=None):
+    # creates the shared state block when none is given (a dict-like state is still accepted)
+    if guiState is None:
+        guiState = SharedState(GUI_STATE_LAYOUT)
     guiState['shutdown'] = False
     guiState['getReportClicked'] = False
     guiState['metarReport'] = ""
+    return guiState
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, guiState, soundState, silence=False, parent=None):
+    def __init__(self, guiState, soundState, soundQueue, silence=False, launchTime=None, exitAfterFirstPaint=False, parent=None):
         super(MainWindow, self).__init__(parent)
         # UI
         self.ui = Ui_MainWindow()
@@ -78,11 +99,50 @@ class MainWindow(QMainWindow):
         # Settings
         self.loadSettings()
         
+        # known stations fill in their altitude (connected after loadSettings, the saved altitude is kept)
+        self.ui.lineEdit_Config_station_identifier.textChanged.connect(self.stationChanged)
+        
         # COMMUNICATION BETWEEN THREADS
         self.guiState = guiState
         self.soundState = soundState
+        self.soundQueue = soundQueue
         self.cl = CLOG(processName="GUI", timed=True, silence=silence)
         
+        # REPORT HISTORY, written from a background thread
+        self.historyWriter = HistoryWriter(backend=HISTORY_BACKEND, silence=silence)
+        
+        # STARTUP TIME, from launch to the first paint of the window
+        self.launchTime = launchTime
+        self.firstPaintTime = None
+        self.exitAfterFirstPaint = exitAfterFirstPaint
+        
+        if STAGE_TIMING:
+            STAGE_TIMINGS.enable()
+        
+        # LIVE PREVIEW
+        if LIVE_PREVIEW:
+            self.connectPreview()
+        
+        # SLOT SCHEDULER
+        self.slotScheduler = None
+        if SLOT_SCHEDULER:
+            self.startSlotScheduler(silence)
+        
+    def paintEvent(self, event):
+        super(MainWindow, self).paintEvent(event)
+        if self.firstPaintTime is None:
+            self.firstPaintTime = time.time()
+            if self.launchTime is not None:
+                self.cl.log(f'First paint {(self.firstPaintTime - self.launchTime)*1e3:.0f} ms after launch')
+            if self.exitAfterFirstPaint:
+                QTimer.singleShot(0, self.close)
+
+    def stationChanged(self, identifier):
+        # the altitude from the station catalog, it can still be edited by hand
+        altitude = station_catalog().altitude(identifier.strip().upper())
+        if altitude is not None:
+            self.ui.spinBox_Config_station_altitude.setValue(altitude)
+
     def browseFolder(self):
         self.history_folder = QFileDialog.getExistingDirectory(None, 'Select a folder:', self.abs_dirname, QFileDialog.ShowDirsOnly)
         self.ui.lineEdit_Config_history_path.setText(self.history_folder)
@@ -91,37 +151,100 @@ class MainWindow(QMainWindow):
         self.guiState['getReportClicked'] = True
 
         # Run Report Computation
-        self.guiState['metarReport'] = metar.get_report_from_gui(type_of_report=self.ui.comboBox_Config_type_of_report.currentData(), station_identifier=self.ui.lineEdit_Config_station_identifier.text(), station_altitude=self.ui.spinBox_Config_station_altitude.value(),
-                                                                force=self.ui.spinBox_Wind_force.value(), direction_left=self.ui.spinBox_Wind_direction_left.value(), direction_right=self.ui.spinBox_Wind_direction_right.value(), gusts=self.ui.spinBox_Wind_gusts.value(),
-                                                                prevailing_distance=self.ui.spinBox_Visibility_prevailing_distance.value(), smallest_distance=self.ui.spinBox_Visibility_smallest_distance.value(),
-                                                                smallest_direction=self.ui.comboBox_Visibility_smallest_direction.currentData(),
-                                                                weather_phenomena=self.ui.lineEdit_Weather_phenomena.text(),
-                                                                cloud_list=[{"crowd": str(self.ui.comboBox_Clouds_layer1_crowd.currentData()), "height": self.ui.spinBox_Clouds_layer1_height.value(), "thundercloud": self.ui.comboBox_Clouds_layer1_thundercloud.currentText()},
-                                                                            {"crowd": str(self.ui.comboBox_Clouds_layer2_crowd.currentData()), "height": self.ui.spinBox_Clouds_layer2_height.value(), "thundercloud": self.ui.comboBox_Clouds_layer2_thundercloud.currentText()},
-                                                                            {"crowd": str(self.ui.comboBox_Clouds_layer3_crowd.currentData()), "height": self.ui.spinBox_Clouds_layer3_height.value(), "thundercloud": self.ui.comboBox_Clouds_layer3_thundercloud.currentText()}],
-                                                                dry_temperature=self.ui.doubleSpinBox_Temperature_and_DewPoint_dry_temperature.value(), wet_temperature=self.ui.doubleSpinBox_Temperature_and_DewPoint_wet_temperature.value(),
-                                                                QFE=self.ui.spinBox_AirPressure_QFE.value()
-                                                                )
+        self.guiState['metarReport'] = metar.get_report_from_gui(**self.reportInputs())
                                                     
         self.updateReport()
         self.saveReport()
         
-        self.soundState['Lana'] = True
+        requestSound(self.soundQueue)
         
         self.guiState['getReportClicked'] = False
             
+    def reportInputs(self):
+        # the arguments of metar.get_report_from_gui, read from the widgets
+        return dict(type_of_report=self.ui.comboBox_Config_type_of_report.currentData(), station_identifier=self.ui.lineEdit_Config_station_identifier.text(), station_altitude=self.ui.spinBox_Config_station_altitude.value(),
+                    force=self.ui.spinBox_Wind_force.value(), direction_left=self.ui.spinBox_Wind_direction_left.value(), direction_right=self.ui.spinBox_Wind_direction_right.value(), gusts=self.ui.spinBox_Wind_gusts.value(),
+                    prevailing_distance=self.ui.spinBox_Visibility_prevailing_distance.value(), smallest_distance=self.ui.spinBox_Visibility_smallest_distance.value(),
+                    smallest_direction=self.ui.comboBox_Visibility_smallest_direction.currentData(),
+                    weather_phenomena=self.ui.lineEdit_Weather_phenomena.text(),
+                    cloud_list=[{"crowd": str(self.ui.comboBox_Clouds_layer1_crowd.currentData()), "height": self.ui.spinBox_Clouds_layer1_height.value(), "thundercloud": self.ui.comboBox_Clouds_layer1_thundercloud.currentText()},
+                                {"crowd": str(self.ui.comboBox_Clouds_layer2_crowd.currentData()), "height": self.ui.spinBox_Clouds_layer2_height.value(), "thundercloud": self.ui.comboBox_Clouds_layer2_thundercloud.currentText()},
+                                {"crowd": str(self.ui.comboBox_Clouds_layer3_crowd.currentData()), "height": self.ui.spinBox_Clouds_layer3_height.value(), "thundercloud": self.ui.comboBox_Clouds_layer3_thundercloud.currentText()}],
+                    dry_temperature=self.ui.doubleSpinBox_Temperature_and_DewPoint_dry_temperature.value(), wet_temperature=self.ui.doubleSpinBox_Temperature_and_DewPoint_wet_temperature.value(),
+                    QFE=self.ui.spinBox_AirPressure_QFE.value()
+                    )
+
+    def connectPreview(self):
+        # every input widget restarts the debounce timer, the preview is computed once the edits pause
+        self.preview = metar.IncrementalReport()
+        self.previewEditedAt = None
+        self.previewTimer = QTimer(self)
+        self.previewTimer.setSingleShot(True)
+        self.previewTimer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.previewTimer.timeout.connect(self.updatePreview)
+        for spinBox in [self.ui.spinBox_Config_station_altitude,
+                        self.ui.spinBox_Wind_force, self.ui.spinBox_Wind_direction_left, self.ui.spinBox_Wind_direction_right, self.ui.spinBox_Wind_gusts,
+                        self.ui.spinBox_Visibility_prevailing_distance, self.ui.spinBox_Visibility_smallest_distance,
+                        self.ui.spinBox_Clouds_layer1_height, self.ui.spinBox_Clouds_layer2_height, self.ui.spinBox_Clouds_layer3_height,
+                        self.ui.doubleSpinBox_Temperature_and_DewPoint_dry_temperature, self.ui.doubleSpinBox_Temperature_and_DewPoint_wet_temperature,
+                        self.ui.spinBox_AirPressure_QFE]:
+            spinBox.valueChanged.connect(self.previewEdited)
+        for comboBox in [self.ui.comboBox_Config_type_of_report, self.ui.comboBox_Visibility_smallest_direction,
+                         self.ui.comboBox_Clouds_layer1_crowd, self.ui.comboBox_Clouds_layer2_crowd, self.ui.comboBox_Clouds_layer3_crowd,
+                         self.ui.comboBox_Clouds_layer1_thundercloud, self.ui.comboBox_Clouds_layer2_thundercloud, self.ui.comboBox_Clouds_layer3_thundercloud]:
+            comboBox.currentIndexChanged.connect(self.previewEdited)
+        for lineEdit in [self.ui.lineEdit_Config_station_identifier, self.ui.lineEdit_Weather_phenomena]:
+            lineEdit.textChanged.connect(self.previewEdited)
+        self.previewEdited()
+
+    def previewEdited(self, *args):
+        if self.previewEditedAt is None:
+            self.previewEditedAt = time.perf_counter()
+        self.previewTimer.start()
+
+    def updatePreview(self):
+        # only the segment groups whose widgets changed are rebuilt (see metar.IncrementalReport)
+        self.ui.lineEdit_METAR_report.setText(self.preview.update(**self.reportInputs()))
+        self.ui.lineEdit_METAR_report.setStyleSheet(PREVIEW_STYLE)
+        self.ui.lineEdit_METAR_report.setToolTip("Preview, not saved: GET REPORT issues it")
+        latency = time.perf_counter() - self.previewEditedAt
+        self.previewEditedAt = None
+        if latency > 1 / 60:
+            self.cl.info("preview %.1f ms after the first edit, rebuilt %s", latency * 1e3, self.preview.rebuilt)
+
+    def startSlotScheduler(self, silence=False):
+        # a precise single-shot QTimer (monotonic), re-armed after every expiry (see src/engine/scheduler.py)
+        self.slotScheduler = SlotScheduler(self.reportInputs, self.historyWriter, self.ui.lineEdit_Config_history_path.text,
+                                           on_report=self.slotReport, silence=silence)
+        self.slotTimer = QTimer(self)
+        self.slotTimer.setSingleShot(True)
+        self.slotTimer.setTimerType(Qt.PreciseTimer)
+        self.slotTimer.timeout.connect(self.slotTimerExpired)
+        self.slotTimer.start(timer_ms(self.slotScheduler.seconds_to_next_slot()))
+
+    def slotTimerExpired(self):
+        self.slotScheduler.on_timer()
+        self.slotTimer.start(timer_ms(self.slotScheduler.seconds_to_next_slot()))
+
+    def slotReport(self, slot, report):
+        # shown and announced like a GET REPORT, the scheduler has already saved it
+        self.guiState['metarReport'] = report
+        self.updateReport()
+        requestSound(self.soundQueue)
+
     def updateReport(self):
-        self.ui.lineEdit_METAR_report.setText(self.guiState['metarReport'])
+        self.issuedReport = self.guiState['metarReport']
+        self.ui.lineEdit_METAR_report.setText(self.issuedReport)
+        self.ui.lineEdit_METAR_report.setStyleSheet("")
+        self.ui.lineEdit_METAR_report.setToolTip("")
 
     def saveReport(self):
-        # Compute Report History
-        if os.path.exists(self.ui.lineEdit_Config_history_path.text()) and len(self.ui.lineEdit_Config_history_path.text())>0:
-            text_file = open(self.ui.lineEdit_Config_history_path.text() + "/report_history.txt", "a")
-            text_file.write(metar.get_Date_and_Time() + ": " + self.guiState['metarReport'] + "\n")
-            text_file.close()
+        # Compute Report History (the writer thread checks the folder and appends)
+        self.historyWriter.write(self.ui.lineEdit_Config_history_path.text(), self.guiState['metarReport'])
             
     def copyReportToClipboard(self):
-        pyperclip.copy(self.guiState['metarReport'])
+        # the report on screen, the preview when LIVE_PREVIEW shows one
+        pyperclip.copy(self.ui.lineEdit_METAR_report.text())
         
         
     def loadSettings(self):
@@ -162,6 +285,8 @@ class MainWindow(QMainWindow):
             
         except:
             pass
+        # the last issued report, saved back instead of a preview on screen
+        self.issuedReport = self.ui.lineEdit_METAR_report.text()
         
     def saveSettings(self):
         self.setting_window.setValue('window_height', self.rect().height())
@@ -191,19 +316,23 @@ class MainWindow(QMainWindow):
         self.setting_variables.setValue('Measurements/Temperature and Dew Point/dry temperature', self.ui.doubleSpinBox_Temperature_and_DewPoint_dry_temperature.value())
         self.setting_variables.setValue('Measurements/Temperature and Dew Point/wet temperature', self.ui.doubleSpinBox_Temperature_and_DewPoint_wet_temperature.value())
         self.setting_variables.setValue('Measurements/Air Pressure/QFE', self.ui.spinBox_AirPressure_QFE.value())
-        self.setting_variables.setValue('METAR Report', self.ui.lineEdit_METAR_report.text())
+        self.setting_variables.setValue('METAR Report', self.issuedReport)
         
     def shutdown(self):
+        if self.slotScheduler is not None:
+            self.slotTimer.stop()
+            self.slotScheduler.log()
         self.saveSettings()
+        self.historyWriter.close()
         self.guiState['shutdown'] = True
+        requestSoundShutdown(self.soundQueue)
+        if STAGE_TIMINGS.enabled:
+            STAGE_TIMINGS.log(self.cl)
         self.cl.log('Graceful shutdown')
 
 
 if __name__ == '__main__':
-    guiState = Manager().dict()
-    guiStateInit(guiState)
-    
-    soundState = Manager().dict()
-    soundStateInit(soundState)
+    guiState = guiStateInit()
+    soundState = soundStateInit()
     
-    runGUI(guiState, soundState, silence=False)
\ No newline at end of file
+    runGUI(guiState, soundState, soundQueueInit(), silence=False)
\ No newline at end of file
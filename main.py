@@ -1,28 +1,80 @@
+import time
+LAUNCH_TIME = time.time()   # before the heavy imports, the GUI reports its first paint against it
+
+import sys
+import argparse
 import multiprocessing as mp
+from multiprocessing.connection import wait
 from gui import runGUI, guiStateInit
-from sound import runSOUND, soundStateInit
+from src.utils.logger import LogListener
+from sound import runSOUND, soundStateInit, soundQueueInit, requestSoundShutdown, SOUND_SHUTDOWN
 
 SILENCE = False
+NULL_AUDIO = False     # play into a null sink, for headless machines
+LAZY_SOUND = True      # start the SOUND process on the first sound request instead of at launch
+STRUCTURED_LOG = False # every process logs JSON lines through one listener in this process (--structured-log)
+LOG_PATH = None        # file for the JSON lines, None writes them to stdout
+
+# imported once by the forkserver, every child is forked with them already loaded
+# (modules that fail to import are skipped by the forkserver)
+PRELOAD_MODULES = ['PyQt5.QtWidgets', 'pyperclip', 'numpy', 'yaml', 'miniaudio', 'metar', 'gui', 'sound']
+
+def defaultStartMethod():
+    # forkserver where it exists (Linux), Windows and macOS keep spawn
+    return 'forkserver' if sys.platform.startswith('linux') else 'spawn'
+
+def setStartMethod(method=None):
+    method = method or defaultStartMethod()
+    if method == 'forkserver':
+        mp.set_forkserver_preload(PRELOAD_MODULES)
+    mp.set_start_method(method)
+    return method
+
+def startThreads(silence, nullAudio=False, lazySound=LAZY_SOUND, launchTime=None, exitAfterFirstPaint=False,
+                 structuredLog=STRUCTURED_LOG, logPath=LOG_PATH):
+    guiState = guiStateInit()
+    soundState = soundStateInit()
+
+    soundQueue = soundQueueInit()
+    logQueue = mp.Queue() if structuredLog else None
+    logListener = LogListener(logQueue, logPath) if structuredLog else None
+
+    pGUI = mp.Process(target=runGUI, args=(guiState, soundState, soundQueue, silence, launchTime, exitAfterFirstPaint, logQueue))
+    pSOUND = mp.Process(target=runSOUND, args=(guiState, soundState, soundQueue, silence, nullAudio, logQueue))
 
-def startThreads(manager, silence):
-    guiState = manager.dict()
-    guiStateInit(guiState)
-    
-    soundState = manager.dict()
-    soundStateInit(soundState)
-    
-    pGUI = mp.Process(target=runGUI, args=(guiState, soundState, silence))
-    pSOUND = mp.Process(target=runSOUND, args=(guiState, soundState, silence))
-    
     pGUI.start()
-    pSOUND.start()
-    
+    soundStarted = not lazySound
+    if lazySound:
+        # sleeps until the GUI asks for a sound or exits, a shutdown request alone never starts it
+        if soundQueue.wanted in wait([soundQueue.wanted, pGUI.sentinel]):
+            soundStarted = soundQueue.wanted.recv() != SOUND_SHUTDOWN
+    if soundStarted:
+        pSOUND.start()
+
     pGUI.join()
-    pSOUND.join()
+    if soundStarted:
+        requestSoundShutdown(soundQueue)    # in case the GUI exited without a graceful shutdown
+        pSOUND.join()
+
+    if logListener is not None:
+        logListener.close()
+    guiState.close()
+    soundState.close()
 
 
 if __name__ == "__main__":
     mp.freeze_support()
-    mp.set_start_method('spawn')
-    with mp.Manager() as manager:
-        startThreads(manager=manager, silence=SILENCE)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="METAR application")
+    parser.add_argument('--start-method', choices=['spawn', 'forkserver', 'fork'], default=None,
+                        help="multiprocessing start method (default: forkserver on Linux, spawn elsewhere)")
+    parser.add_argument('--eager-sound', action='store_true', help="start the SOUND process at launch")
+    parser.add_argument('--exit-after-first-paint', action='store_true', help="close the window once painted (startup benchmark)")
+    parser.add_argument('--structured-log', nargs='?', const='-', default=None, metavar='PATH',
+                        help="log JSON lines through one listener, to PATH or stdout (default: readable lines from each process)")
+    args = parser.parse_args()
+
+    setStartMethod(args.start_method)
+    startThreads(silence=SILENCE, nullAudio=NULL_AUDIO, lazySound=LAZY_SOUND and not args.eager_sound,
+                 launchTime=LAUNCH_TIME, exitAfterFirstPaint=args.exit_after_first_paint,
+                 structuredLog=STRUCTURED_LOG or args.structured_log is not None,
+                 logPath=LOG_PATH if args.structured_log in (None, '-') else args.structured_log)
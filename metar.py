@@ -1,24 +1,38 @@
-
-import yaml
+from __future__ import annotations
+import re
 import sys
-from omegaconf import DictConfig
-import numpy as np
-from datetime import datetime, timezone
+import math
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass, field
 from typing import Optional
+from src.utils.psychrometrics import scalar_dew_point
+from src.utils.stage_timing import STAGE_TIMINGS
 
 ReportTimeInterval = 30 # minutes
 FIRST_HOUR_REPORT = 20
 SECOND_HOUR_REPORT = 50
 
 VALID_TYPES_OF_REPORT = ['METAR', 'MET1']
-VALID_STATION_IDENTIFIER = ['LFSB', 'LSZB', 'LSGG', 'LSZG', 'LSGC', 'LSZA', 'LSZR', 'LSZH', 'LSZC', 'LSZS', 'LSGS', 'LSZG',
-                            'LSMA', 'LSMD', 'LSME', 'LSMM', 'LSMP', 'LSZL', 'LSMO',
-                            'LSMC']
+# VALID_STATION_IDENTIFIER and VALID_STATION_SET are the stations of config/stations.yaml, read on first use (__getattr__)
 VALID_VISIBILITY_DIRECTIONS = ['N', 'S', 'E', 'W', 'NE', 'NW', 'SE', 'SW', "", None]
 VALID_CROWD = ['FEW', 'SCT', 'BKN', 'OVC']
 VALID_THUNDERCLOUDS = ['TCU', 'CB']
 
+@lru_cache(maxsize=None)
+def valid_station_set() -> frozenset:
+    # the station catalog is the one list of stations, loaded on first use (not at import)
+    from src.stations.catalog import station_catalog
+    return frozenset(station_catalog().identifiers())
+
+def __getattr__(name: str):
+    if name == "VALID_STATION_IDENTIFIER":
+        from src.stations.catalog import station_catalog
+        return station_catalog().identifiers()
+    if name == "VALID_STATION_SET":
+        return valid_station_set()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 @dataclass
 class Wind:
     force: int                              # in Knots
@@ -30,8 +44,8 @@ class Wind:
     report_string: str = field(init=False)
     
     def __post_init__(self) -> None:
-        self.direction_left = np.mod(round(float(self.direction_left)/10)*10,360)
-        self.direction_right = np.mod(round(self.direction_right/10)*10,360)
+        self.direction_left = (round(float(self.direction_left)/10)*10) % 360
+        self.direction_right = (round(self.direction_right/10)*10) % 360
         
         if (self.direction_left <= self.direction_right):
             self.direction_mean = round(((self.direction_left + self.direction_right)/2)/10)*10
@@ -43,7 +57,7 @@ class Wind:
         self.report_string = " "
         if (self.force == 0):
             self.direction_mean = 0
-            self.report_string += string_zero_padding(string=str(np.mod(round(self.direction_mean/10)*10,360)), total_length=3)
+            self.report_string += string_zero_padding(string=str((round(self.direction_mean/10)*10) % 360), total_length=3)
             self.report_string += string_zero_padding(string=str(self.force), total_length=2)
             self.report_string += "KT"
         elif (self.force > 99 or (self.gusts is not None and self.gusts > 99)):
@@ -51,7 +65,7 @@ class Wind:
         elif (60 <= self.direction_diff and self.direction_diff < 180 and self.force < 3) or self.direction_diff >= 180:
             self.report_string += "VRB" + string_zero_padding(string=str(self.force), total_length=2) + "KT"
         else:
-            self.report_string += string_zero_padding(string=str(np.mod(round(self.direction_mean/10)*10,360)), total_length=3)
+            self.report_string += string_zero_padding(string=str((round(self.direction_mean/10)*10) % 360), total_length=3)
             self.report_string += string_zero_padding(string=str(self.force), total_length=2)
             if ((self.gusts is not None) and (self.gusts >= self.force + 10)):
                 self.report_string += "G" + string_zero_padding(string=str(self.gusts), total_length=2)
@@ -62,12 +76,12 @@ class Wind:
         
 def floor_visibility(dist: int) -> int:
     if (0 <= dist and dist < 800):
-        dist = int(np.floor(dist/50)*50)
+        dist = math.floor(dist/50)*50
     elif (800 <= dist and dist < 5000):
-        dist = int(np.floor(dist/100)*100)
+        dist = math.floor(dist/100)*100
     elif (5000 <= dist and dist < 10000):
-        dist = int(np.floor(dist/1000)*1000)
-    dist = np.minimum(dist, 9999)
+        dist = math.floor(dist/1000)*1000
+    dist = min(dist, 9999)
     return dist
 
 @dataclass
@@ -92,10 +106,10 @@ class Visibility:
                 
 def round_cloud_height(height: int) -> int:
     if (0 <= height and height < 10000):
-        height = int(np.floor(height/100)*100)
+        height = math.floor(height/100)*100
     elif (10000 <= height and height < 43000):
-        height = int(np.floor(height/1000)*1000)
-    height = np.minimum(height, 43000)
+        height = math.floor(height/1000)*1000
+    height = min(height, 43000)
     return height
 
 @dataclass
@@ -138,14 +152,8 @@ class Temperature_and_DewPoint:
     def __post_init__(self) -> None:
         self.report_string = ""
         if (self.dry_temperature is not None and self.wet_temperature is not None):
-            # calculate dewPoint
-            saturated_vapor_pressure_dry = 6.108*np.exp(17.27*self.dry_temperature/(237.3+self.dry_temperature))
-            saturated_vapor_pressure_wet = 6.108*np.exp(17.27*self.wet_temperature/(237.3+self.wet_temperature))
-            vapor_pressure_water = saturated_vapor_pressure_wet - 0.00066*(1+0.00115*self.wet_temperature)*(self.dry_temperature-self.wet_temperature)*self.airPressure
-            z = np.log(vapor_pressure_water/6.108)/17.27
-            self.dewPoint = 237.3*z/(1-z)
-            
-            # TODO limit log
+            # calculate dewPoint (NaN when the vapour pressure is not positive)
+            self.dewPoint = scalar_dew_point(self.dry_temperature, self.wet_temperature, self.airPressure)
             
             self.report_string += " "
                     
@@ -154,7 +162,9 @@ class Temperature_and_DewPoint:
             else:
                 self.report_string += string_zero_padding(string=str(round(self.dry_temperature)), total_length=2)
             self.report_string += "/"
-            if self.dewPoint < 0:
+            if math.isnan(self.dewPoint):
+                self.report_string += "//"
+            elif self.dewPoint < 0:
                 self.report_string += "M" + string_zero_padding(str(abs(round(self.dewPoint))), total_length=2)
             else:
                 self.report_string += string_zero_padding(string=str(round(self.dewPoint)), total_length=2)
@@ -176,13 +186,46 @@ def string_zero_padding(string: str, total_length: int) -> str:
     string = "0" * (total_length-len(string)) + string
     return string
 
-def get_Date_and_Time() -> str:
-    return string_zero_padding(string=str(datetime.now().year), total_length=4) + "-" + \
-           string_zero_padding(string=str(datetime.now().month), total_length=2) + "-" + \
-           string_zero_padding(string=str(datetime.now().day), total_length=2) + " " + \
-           string_zero_padding(string=str(datetime.now().hour), total_length=2) + "h" + \
-           string_zero_padding(string=str(datetime.now().minute), total_length=2) + "m" + \
-           string_zero_padding(string=str(datetime.now().second), total_length=2) + "s"
+# ---------------------------------------------------------------------------
+# Clock: every report reads the time once, through an injectable clock (set_clock),
+# or takes an explicit observation time to re-encode historical data
+
+def wall_clock() -> datetime:
+    return datetime.now(timezone.utc)
+
+_clock = wall_clock
+
+def set_clock(clock=None) -> None:
+    # clock() returns an aware datetime (e.g. a simulated clock for replays), None restores the wall clock
+    global _clock
+    _clock = clock or wall_clock
+
+def utc_time(observation_time: Optional[datetime] = None) -> datetime:
+    # the observation time in UTC (naive times are taken as UTC), or one reading of the clock
+    if observation_time is None:
+        return _clock()
+    if observation_time.tzinfo is None:
+        return observation_time.replace(tzinfo=timezone.utc)
+    return observation_time.astimezone(timezone.utc)
+
+def next_slot_time(after: datetime) -> datetime:
+    # the first report slot (FIRST_HOUR_REPORT or SECOND_HOUR_REPORT past the hour) strictly after `after`
+    hour = after.replace(minute=0, second=0, microsecond=0)
+    for h in (hour, hour + timedelta(hours=1)):
+        for minute in sorted((FIRST_HOUR_REPORT, SECOND_HOUR_REPORT)):
+            slot = h.replace(minute=minute)
+            if slot > after:
+                return slot
+
+def get_Date_and_Time(now: Optional[datetime] = None) -> str:
+    # local time of `now` (default: one reading of the clock)
+    now = utc_time(now).astimezone() if now is None or now.tzinfo is not None else now
+    return string_zero_padding(string=str(now.year), total_length=4) + "-" + \
+           string_zero_padding(string=str(now.month), total_length=2) + "-" + \
+           string_zero_padding(string=str(now.day), total_length=2) + " " + \
+           string_zero_padding(string=str(now.hour), total_length=2) + "h" + \
+           string_zero_padding(string=str(now.minute), total_length=2) + "m" + \
+           string_zero_padding(string=str(now.second), total_length=2) + "s"
 
 @dataclass
 class Report:
@@ -203,18 +246,19 @@ class Station:
     def __post_init__(self) -> None:
         # station identifier
         self.report_identifier = ""
-        if self.identifier in VALID_STATION_IDENTIFIER:
+        if self.identifier in valid_station_set():
             self.report_identifier  += " " + self.identifier
             
             
 
-def get_UTC_Date_and_Time() -> str:
-    minutes = datetime.now(timezone.utc).minute
+def get_UTC_Date_and_Time(observation_time: Optional[datetime] = None) -> str:
+    now = utc_time(observation_time)
+    minutes = now.minute
     minutes = int((minutes>=(FIRST_HOUR_REPORT-ReportTimeInterval/2)%60) and (minutes<(FIRST_HOUR_REPORT+ReportTimeInterval/2))%60)*FIRST_HOUR_REPORT + \
               int((minutes>=(SECOND_HOUR_REPORT-ReportTimeInterval/2)%60) or (minutes<(SECOND_HOUR_REPORT+ReportTimeInterval/2)%60))*SECOND_HOUR_REPORT
     return " " + \
-           string_zero_padding(string=str(datetime.now(timezone.utc).day), total_length=2) + \
-           string_zero_padding(string=str(datetime.now(timezone.utc).hour), total_length=2) + \
+           string_zero_padding(string=str(now.day), total_length=2) + \
+           string_zero_padding(string=str(now.hour), total_length=2) + \
            string_zero_padding(string=str(minutes), total_length=2) + \
            "Z"
     
@@ -269,53 +313,724 @@ def get_ColorCode(station_altitude: int, distance: int, cloud_list: list) -> str
         
     return s
 
+# ---------------------------------------------------------------------------
+# Segment builders: each segment string from its normalised inputs only, so that
+# SEGMENT_CACHE can memoize them (observations change slowly between reports)
+
+SEGMENT_CACHE_SIZE = 256    # entries per segment
+
+def wind_key(force, direction_left, direction_right, gusts) -> tuple:
+    # the directions rounded as Wind does, gusts only when they show up in the report
+    if force == 0:
+        return (force, 0, 0, None)     # force keeps its type, 0.0 is reported differently from 0
+    if gusts is not None and gusts <= 99 and gusts < force + 10:
+        gusts = None
+    return (force, (round(float(direction_left)/10)*10) % 360, (round(direction_right/10)*10) % 360, gusts)
+
+def cloud_layers(cloud_list: list) -> tuple:
+    # the reported layers as a hashable key, layers without a valid crowd never show up
+    return tuple((c["crowd"], c["height"], c["thundercloud"]) for c in cloud_list if c["crowd"] in VALID_CROWD)
+
+def wind_segment(force, direction_left, direction_right, gusts) -> str:
+    return Wind(force=force, direction_left=direction_left, direction_right=direction_right, gusts=gusts).report_string
+
+def visibility_segment(prevailing_distance, smallest_distance, smallest_direction) -> str:
+    return Visibility(prevailing_distance=prevailing_distance, smallest_distance=smallest_distance, smallest_direction=smallest_direction).report_string
+
+def cloud_segment(layers: tuple) -> tuple:
+    # (report string, lowest cloud in ft, thunderclouds available)
+    clouds = Clouds(cloud_list=[{"crowd": crowd, "height": height, "thundercloud": thundercloud} for crowd, height, thundercloud in layers])
+    return clouds.report_string, clouds.lowest_cloud, clouds.thunderclouds_available
+
+def temperature_segment(dry_temperature, wet_temperature, QFE) -> str:
+    return Temperature_and_DewPoint(dry_temperature=dry_temperature, wet_temperature=wet_temperature, airPressure=QFE).report_string
+
+def qnh_segment(QFE, station_altitude) -> str:
+    return AirPressure(QFE=QFE, station_altitude=station_altitude).report_string
+
+def color_code_segment(station_altitude, distance, layers: tuple) -> str:
+    return get_ColorCode(station_altitude, distance, [{"crowd": crowd, "height": height} for crowd, height, _ in layers if crowd == "BKN"])
+
+SEGMENT_BUILDERS = {"wind": wind_segment, "visibility": visibility_segment, "clouds": cloud_segment,
+                    "temperature": temperature_segment, "qnh": qnh_segment, "color_code": color_code_segment}
+
+class SegmentCache():
+    # One bounded LRU (functools.lru_cache) per segment builder, reached as attributes:
+    # SEGMENT_CACHE.wind(*wind_key(...)). disable() swaps the plain builders back in.
+    # The caches are typed: 1011 and 1011.0 are different entries, as they encode differently.
+    def __init__(self, maxsize: int = SEGMENT_CACHE_SIZE, enabled: bool = True) -> None:
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self._cached = {name: lru_cache(maxsize=maxsize, typed=True)(builder) for name, builder in SEGMENT_BUILDERS.items()}
+        self._install()
+
+    def _install(self) -> None:
+        for name, builder in SEGMENT_BUILDERS.items():
+            setattr(self, name, self._cached[name] if self.enabled else builder)
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._install()
+
+    def disable(self) -> None:
+        self.enabled = False
+        self._install()
+
+    def clear(self) -> None:
+        # empties the caches and resets the statistics
+        for cached in self._cached.values():
+            cached.cache_clear()
+
+    def stats(self) -> dict:
+        # hits, misses, current size and hit rate per segment, and over all segments under "total"
+        # (whose maxsize is the capacity of all the caches together)
+        stats = {name: cached.cache_info()._asdict() for name, cached in self._cached.items()}
+        stats["total"] = {"hits": sum(s["hits"] for s in stats.values()), "misses": sum(s["misses"] for s in stats.values()),
+                          "maxsize": self.maxsize * len(self._cached), "currsize": sum(s["currsize"] for s in stats.values())}
+        for s in stats.values():
+            s["hit_rate"] = s["hits"] / (s["hits"] + s["misses"]) if s["hits"] + s["misses"] else 0.0
+        return stats
+
+SEGMENT_CACHE = SegmentCache()
+
+def catalog_altitude(station_identifier: str) -> int:
+    from src.stations.catalog import station_catalog
+    altitude = station_catalog().altitude(station_identifier)
+    if altitude is None:
+        raise ValueError(str(station_identifier) + " has no altitude in the station catalog!")
+    return altitude
+
+def is_cavok(prevailing_distance: int, lowest_cloud: int, thunderclouds_available: bool, no_phenomena: bool) -> bool:
+    return (prevailing_distance >= 10000 and \
+            lowest_cloud >= 5000 and \
+            not thunderclouds_available and \
+            no_phenomena
+            )
+
+def assemble_report(header: str, date_and_time: str, wind: str, cavok: bool, visibility: str, weather: str,
+                    clouds: str, temperature: str, qnh: str, color_code: str) -> str:
+    #TODO put blank space in each function instead 
+    
+    report_string = header + date_and_time + wind
+    if cavok:
+        report_string += " CAVOK"
+    else:
+        report_string += visibility + weather + clouds
+    return report_string + temperature + qnh + color_code
+
 def get_report_from_gui(type_of_report, station_identifier, station_altitude,
                         force, direction_left, direction_right, gusts,
                         prevailing_distance, smallest_distance, smallest_direction,
                         weather_phenomena,
                         cloud_list,
                         dry_temperature, wet_temperature,
-                        QFE
+                        QFE,
+                        observation_time: Optional[datetime] = None
                         ) -> str:
-    
+    # station_altitude=None takes the altitude of the station from the station catalog,
+    # observation_time=None reads the clock once (see set_clock)
+    if station_altitude is None:
+        station_altitude = catalog_altitude(station_identifier)
+
+    # per-stage timing, see src/utils/stage_timing.py (STAGE_TIMINGS.enable())
+    timings = STAGE_TIMINGS if STAGE_TIMINGS.enabled else None
+    if timings: t = t0 = timings.start()
+
     report = Report(type=type_of_report)
     station = Station(identifier=station_identifier, altitude=station_altitude)
-    wind = Wind(force=force, direction_left=direction_left, direction_right=direction_right, gusts=gusts)
-    visibility = Visibility(prevailing_distance=prevailing_distance, smallest_distance=smallest_distance, smallest_direction=smallest_direction)
+    if timings: t = timings.lap("header", t)
+    # segments memoized on their normalised inputs, see SEGMENT_CACHE
+    segments = SEGMENT_CACHE
+    wind = segments.wind(*wind_key(force, direction_left, direction_right, gusts))
+    if timings: t = timings.lap("wind", t)
+    visibility = segments.visibility(prevailing_distance, smallest_distance, smallest_direction)
     weather = Weather(weather_phenomena=weather_phenomena)
-    clouds = Clouds(cloud_list=cloud_list)
-    airPressure = AirPressure(QFE=QFE, station_altitude=station.altitude)
-    temperature_and_dewPoint = Temperature_and_DewPoint(dry_temperature=dry_temperature, wet_temperature=wet_temperature, airPressure=airPressure.QFE)
+    if timings: t = timings.lap("visibility", t)
+    layers = cloud_layers(cloud_list)
+    clouds, lowest_cloud, thunderclouds_available = segments.clouds(layers)
+    if timings: t = timings.lap("clouds", t)
+    airPressure = segments.qnh(QFE, station.altitude)
+    if timings: t = timings.lap("qnh", t)
+    temperature_and_dewPoint = segments.temperature(dry_temperature, wet_temperature, QFE)
+    if timings: t = timings.lap("dew_point", t)
+
+    color_code = segments.color_code(station.altitude, prevailing_distance, layers)
+    if timings: t = timings.lap("color_code", t)
+    date_and_time = get_UTC_Date_and_Time(observation_time)
+    if timings: t = timings.lap("time", t)
+
+    report_string = assemble_report(report.report_type + station.report_identifier, date_and_time, wind,
+                                    is_cavok(prevailing_distance, lowest_cloud, thunderclouds_available, weather.no_phenomena),
+                                    visibility, weather.report_string, clouds, temperature_and_dewPoint, airPressure, color_code)
+    if timings:
+        timings.lap("assembly", t)
+        timings.lap("total", t0)
+
+    return report_string
+
+class IncrementalReport():
+    # Live preview: keeps the inputs and segments of the previous report and, on update(),
+    # only rebuilds the segment groups whose inputs changed before reassembling the string.
+    # update() takes the arguments of get_report_from_gui and returns the same report.
+    GROUPS = {"header": ("type_of_report", "station_identifier"),
+              "wind": ("force", "direction_left", "direction_right", "gusts"),
+              "visibility": ("prevailing_distance", "smallest_distance", "smallest_direction", "weather_phenomena"),
+              "clouds": ("cloud_list",),
+              "temperature": ("dry_temperature", "wet_temperature", "QFE"),
+              "pressure": ("QFE", "station_altitude"),
+              "color_code": ("station_altitude", "prevailing_distance", "cloud_list")}
+
+    def __init__(self) -> None:
+        self.inputs = {}
+        self.segments = {}
+        self.rebuilt = []       # the groups rebuilt by the last update
+
+    def update(self, observation_time: Optional[datetime] = None, **inputs) -> str:
+        if inputs["station_altitude"] is None:
+            # as in get_report_from_gui, before the groups compare it
+            inputs["station_altitude"] = catalog_altitude(inputs["station_identifier"])
+        self.rebuilt = [group for group, names in self.GROUPS.items()
+                        if group not in self.segments or any(inputs[name] != self.inputs[name] for name in names)]
+        for group in self.rebuilt:
+            self.segments[group] = self._build(group, inputs)
+        self.inputs = dict(inputs, cloud_list=[dict(c) for c in inputs["cloud_list"]])    # the caller may reuse its dicts
+
+        visibility, weather, no_phenomena = self.segments["visibility"]
+        clouds, lowest_cloud, thunderclouds_available = self.segments["clouds"]
+        return assemble_report(self.segments["header"], get_UTC_Date_and_Time(observation_time), self.segments["wind"],
+                               is_cavok(inputs["prevailing_distance"], lowest_cloud, thunderclouds_available, no_phenomena),
+                               visibility, weather, clouds, self.segments["temperature"], self.segments["pressure"],
+                               self.segments["color_code"])
+
+    def _build(self, group: str, i: dict):
+        segments = SEGMENT_CACHE
+        if group == "header":
+            return Report(type=i["type_of_report"]).report_type + \
+                   Station(identifier=i["station_identifier"], altitude=i["station_altitude"]).report_identifier
+        if group == "wind":
+            return segments.wind(*wind_key(i["force"], i["direction_left"], i["direction_right"], i["gusts"]))
+        if group == "visibility":
+            weather = Weather(weather_phenomena=i["weather_phenomena"])
+            return (segments.visibility(i["prevailing_distance"], i["smallest_distance"], i["smallest_direction"]),
+                    weather.report_string, weather.no_phenomena)
+        if group == "clouds":
+            return segments.clouds(cloud_layers(i["cloud_list"]))
+        if group == "temperature":
+            return segments.temperature(i["dry_temperature"], i["wet_temperature"], i["QFE"])
+        if group == "pressure":
+            return segments.qnh(i["QFE"], i["station_altitude"])
+        if group == "color_code":
+            return segments.color_code(i["station_altitude"], i["prevailing_distance"], cloud_layers(i["cloud_list"]))
+        raise ValueError(group + " is not a Valid Segment Group!")
+
+# ---------------------------------------------------------------------------
+# Batch encoding: same report strings as get_report_from_gui, computed column-wise
+# (numpy is imported inside these functions so that `import metar` stays light for the GUI)
+# ---------------------------------------------------------------------------
+
+def _column(values, n: int, dtype=None) -> np.ndarray:
+    import numpy as np
+    values = np.asarray(values, dtype=dtype)
+    if values.ndim == 0:
+        values = np.full(n, values, dtype=values.dtype)
+    return values
+
+def _optional_column(values, n: int):
+    import numpy as np
+    # None (or NaN entries) stand for a missing measurement, like the Optional fields of the dataclasses
+    if values is None:
+        return np.zeros(n, dtype=np.float64), np.zeros(n, dtype=bool)
+    values = _column(values, n, dtype=np.float64)
+    return values, ~np.isnan(values)
+
+def _string_column(values, n: int) -> np.ndarray:
+    import numpy as np
+    if values is None or isinstance(values, str):
+        return np.full(n, "" if values is None else values)     # dtype=str would truncate to one character
+    return np.array(["" if v is None else v for v in values], dtype=str)
+
+def _pad(values: np.ndarray, total_length: int) -> np.ndarray:
+    import numpy as np
+    return np.char.rjust(values.astype(str), total_length, "0")
+
+def _join(*columns) -> np.ndarray:
+    import numpy as np
+    out = columns[0]
+    for column in columns[1:]:
+        out = np.char.add(out, column)
+    return out
+
+def floor_visibility_array(dist: np.ndarray) -> np.ndarray:
+    import numpy as np
+    dist = np.asarray(dist, dtype=np.float64)
+    dist = np.select([(0 <= dist) & (dist < 800), (800 <= dist) & (dist < 5000), (5000 <= dist) & (dist < 10000)],
+                     [np.floor(dist/50)*50, np.floor(dist/100)*100, np.floor(dist/1000)*1000],
+                     default=dist)
+    return np.minimum(dist, 9999).astype(np.int64)
+
+def round_cloud_height_array(height: np.ndarray) -> np.ndarray:
+    import numpy as np
+    height = np.asarray(height, dtype=np.float64)
+    height = np.select([(0 <= height) & (height < 10000), (10000 <= height) & (height < 43000)],
+                       [np.floor(height/100)*100, np.floor(height/1000)*1000],
+                       default=height)
+    return np.minimum(height, 43000)
+
+def datetime64_column(times) -> np.ndarray:
+    import numpy as np
+    # datetime64[m] UTC column from datetime64 values or datetimes (aware ones are converted, naive ones are UTC)
+    if isinstance(times, np.ndarray) and np.issubdtype(times.dtype, np.datetime64):
+        return times.astype("datetime64[m]")
+    if isinstance(times, (datetime, np.datetime64)):
+        times = [times]
+    return np.array([np.datetime64(utc_time(t).replace(tzinfo=None), "m") if isinstance(t, datetime) else t for t in times],
+                    dtype="datetime64[m]")
+
+def slot_time_strings(timestamps) -> np.ndarray:
+    # vectorized get_UTC_Date_and_Time: UTC datetime64 values -> "DDHHMMZ" with the minutes
+    # rounded to the FIRST_HOUR_REPORT / SECOND_HOUR_REPORT slot (without the leading space)
+    import numpy as np
+    timestamps = datetime64_column(timestamps)
+    n = timestamps.size
+    minutes = (timestamps - timestamps.astype("datetime64[h]")).astype(np.int64)
+    hours = (timestamps.astype("datetime64[h]") - timestamps.astype("datetime64[D]")).astype(np.int64)
+    days = (timestamps.astype("datetime64[D]") - timestamps.astype("datetime64[M]")).astype(np.int64) + 1
+    # same slot selection as get_UTC_Date_and_Time
+    slots = ((minutes >= (FIRST_HOUR_REPORT-ReportTimeInterval/2)%60) & (minutes < (FIRST_HOUR_REPORT+ReportTimeInterval/2))).astype(np.int64)*FIRST_HOUR_REPORT + \
+            ((minutes >= (SECOND_HOUR_REPORT-ReportTimeInterval/2)%60) | (minutes < (SECOND_HOUR_REPORT+ReportTimeInterval/2)%60)).astype(np.int64)*SECOND_HOUR_REPORT
+    return _join(_pad(days, 2), _pad(hours, 2), _pad(slots, 2), np.full(n, "Z"))
+
+def _utc_slot_strings(timestamps, n: int) -> np.ndarray:
+    import numpy as np
+    if timestamps is None:
+        timestamps = utc_time()     # one clock reading for the whole batch
+    timestamps = datetime64_column(timestamps)
+    if timestamps.size == 1:
+        timestamps = np.full(n, timestamps[0])
+    return np.char.add(" ", slot_time_strings(timestamps))
+
+def _wind_strings(force, direction_left, direction_right, gusts, gusts_present) -> np.ndarray:
+    import numpy as np
+    n = len(force)
+    direction_left = np.mod(np.round(direction_left/10)*10, 360).astype(np.int64)
+    direction_right = np.mod(np.round(direction_right/10)*10, 360).astype(np.int64)
+    ordered = direction_left <= direction_right
+    unwrapped_left = np.where(ordered, direction_left, direction_left-360)
+    direction_mean = (np.round(((unwrapped_left + direction_right)/2)/10)*10).astype(np.int64)
+    direction_diff = direction_right - unwrapped_left
+    direction_mean = np.where(force == 0, 0, direction_mean)
+
+    calm = force == 0
+    above_99 = ~calm & ((force > 99) | (gusts_present & (gusts > 99)))
+    variable = ~calm & ~above_99 & (((60 <= direction_diff) & (direction_diff < 180) & (force < 3)) | (direction_diff >= 180))
+    directional = ~calm & ~above_99 & ~variable
+
+    force_string = _pad(force, 2)
+    mean_string = _pad(np.mod(np.round(direction_mean/10)*10, 360).astype(np.int64), 3)
+    gusts_string = np.where(gusts_present & (gusts >= force + 10), np.char.add("G", _pad(np.where(gusts_present, gusts, 0).astype(np.int64), 2)), "")
+    range_string = np.where((60 <= direction_diff) & (direction_diff < 180) & (force >= 3),
+                            _join(np.full(n, " "), _pad(direction_left, 3), np.full(n, "V"), _pad(direction_right, 3)), "")
+
+    return np.select([calm, above_99, variable, directional],
+                     [_join(np.full(n, " "), mean_string, force_string, np.full(n, "KT")),
+                      np.full(n, " P99"),
+                      _join(np.full(n, " VRB"), force_string, np.full(n, "KT")),
+                      _join(np.full(n, " "), mean_string, force_string, gusts_string, np.full(n, "KT"), range_string)],
+                     default="")
+
+def _temperature_strings(temperature: np.ndarray) -> np.ndarray:
+    import numpy as np
+    rounded = np.round(temperature)
+    valid = ~np.isnan(rounded)
+    digits = _pad(np.abs(np.where(valid, rounded, 0)).astype(np.int64), 2)
+    return np.where(~valid, "//", np.where(temperature < 0, np.char.add("M", digits), digits))
+
+def encode_batch(type_of_report, station_identifier, station_altitude,
+                 force, direction_left, direction_right, gusts,
+                 prevailing_distance, smallest_distance, smallest_direction,
+                 weather_phenomena,
+                 cloud_crowd, cloud_height, cloud_thundercloud,
+                 dry_temperature, wet_temperature,
+                 QFE,
+                 timestamps=None
+                 ) -> list:
+    import numpy as np
+    from src.utils.psychrometrics import dew_point
+    # Every argument is either a scalar (shared by all reports) or a column with one entry per report.
+    # Cloud layers are fixed-width (n_reports, n_layers) arrays; unused layers have an empty crowd.
+    # station_altitude=None takes the altitudes (and QNH corrections) from the station catalog.
+    n = max(np.size(column) for column in (force, direction_left, direction_right, prevailing_distance,
+                                           dry_temperature, wet_temperature, QFE, station_altitude, station_identifier))
+    force = _column(force, n, dtype=np.int64)
+
+    # Report type and station
+    type_of_report = _string_column(type_of_report, n)
+    station_identifier = _string_column(station_identifier, n)
+    if station_altitude is None:
+        from src.stations.catalog import station_catalog
+        station_altitude, qnh_correction = station_catalog().constant_columns(station_identifier)
+        if np.isnan(station_altitude).any():
+            raise ValueError(", ".join(np.unique(station_identifier[np.isnan(station_altitude)])) + " has no altitude in the station catalog!")
+    else:
+        station_altitude = _column(station_altitude, n, dtype=np.float64)
+        qnh_correction = np.round(station_altitude*3.3/30)
+    report_type = np.where(np.isin(type_of_report, VALID_TYPES_OF_REPORT), type_of_report, "")
+    report_identifier = np.where(np.isin(station_identifier, list(valid_station_set())), np.char.add(" ", station_identifier), "")
+
+    # Wind
+    gusts, gusts_present = _optional_column(gusts, n)
+    wind = _wind_strings(force,
+                         _column(direction_left, n, dtype=np.float64),
+                         _column(direction_right, n, dtype=np.float64),
+                         gusts, gusts_present)
+
+    # Visibility
+    prevailing_distance = _column(prevailing_distance, n, dtype=np.float64)
+    smallest_distance, smallest_present = _optional_column(smallest_distance, n)
+    smallest_direction = _string_column(smallest_direction, n)
+    prevailing_floor = floor_visibility_array(prevailing_distance)
+    visibility = np.char.add(" ", _pad(prevailing_floor, 4))
+    show_smallest = smallest_present & (smallest_direction != "") & \
+                    ((smallest_distance < 1500) | ((smallest_distance < 0.5*prevailing_floor) & (smallest_distance < 5000)))
+    visibility = np.where(show_smallest,
+                          _join(visibility, np.full(n, " "), _pad(floor_visibility_array(np.where(smallest_present, smallest_distance, 0)), 4), smallest_direction),
+                          visibility)
+
+    # Weather
+    weather_phenomena = _string_column(weather_phenomena, n)
+    no_phenomena = weather_phenomena == ""
+    weather = np.where(no_phenomena, "", np.char.add(" ", weather_phenomena))
+
+    # Clouds
+    cloud_crowd = np.atleast_2d(np.asarray(cloud_crowd, dtype=str))
+    cloud_shape = (n, cloud_crowd.shape[-1])
+    cloud_crowd = np.broadcast_to(cloud_crowd, cloud_shape)
+    cloud_height = np.broadcast_to(np.asarray(cloud_height, dtype=np.float64), cloud_shape)
+    cloud_thundercloud = np.broadcast_to(np.asarray(cloud_thundercloud, dtype=str), cloud_shape)
+    lowest_cloud = np.full(n, 20000, dtype=np.float64)
+    thunderclouds_available = np.zeros(n, dtype=bool)
+    lowest_height_above_ground = np.full(n, 20000, dtype=np.float64)
+    clouds = np.full(n, "", dtype=str)
+    for layer in range(cloud_crowd.shape[1]):
+        crowd = cloud_crowd[:, layer]
+        height = cloud_height[:, layer]*3.3
+        thundercloud = cloud_thundercloud[:, layer]
+        valid = np.isin(crowd, VALID_CROWD)
+        rounded_height = round_cloud_height_array(height)
+        lowest_cloud = np.where(valid & (height < lowest_cloud), rounded_height, lowest_cloud)
+        thunderclouds_available |= valid & np.isin(thundercloud, VALID_THUNDERCLOUDS)
+        layer_string = _join(np.full(n, " "), crowd, _pad(np.trunc(rounded_height/100).astype(np.int64), 3),
+                             np.where(np.isin(thundercloud, VALID_THUNDERCLOUDS), thundercloud, ""))
+        clouds = np.char.add(clouds, np.where(valid, layer_string, ""))
+        # colour code only looks at broken layers, measured from the station altitude
+        height_above_ground = np.round((cloud_height[:, layer] - station_altitude) * 3.3)
+        lowest_height_above_ground = np.where((crowd == "BKN") & (height_above_ground < lowest_height_above_ground),
+                                              height_above_ground, lowest_height_above_ground)
 
-    #TODO put blank space in each function instead 
-    
-    report_string = ""
-    report_string += report.report_type
-    report_string += station.report_identifier
-    report_string += get_UTC_Date_and_Time()
-    report_string += wind.report_string
-        
     # CAVOK?
-    if (visibility.prevailing_distance >= 10000 and \
-        clouds.lowest_cloud >= 5000 and \
-        not clouds.thunderclouds_available and \
-        weather.no_phenomena
-        ):
+    cavok = (prevailing_distance >= 10000) & (lowest_cloud >= 5000) & ~thunderclouds_available & no_phenomena
+    sky = np.where(cavok, " CAVOK", _join(visibility, weather, clouds))
+
+    # Temperature and Dew Point
+    dry_temperature = _column(dry_temperature, n, dtype=np.float64)
+    wet_temperature = _column(wet_temperature, n, dtype=np.float64)
+    QFE = _column(QFE, n, dtype=np.float64)
+    # NaN (missing) temperatures or QFE leave their group out, like Temperature_and_DewPoint and AirPressure
+    temperature = np.where(np.isnan(dry_temperature) | np.isnan(wet_temperature), "",
+                           _join(np.full(n, " "), _temperature_strings(dry_temperature), np.full(n, "/"),
+                                 _temperature_strings(dew_point(dry_temperature, wet_temperature, QFE))))
+
+    # Air Pressure
+    QFE_present = ~np.isnan(QFE)
+    QNH = np.where(QFE_present, QFE, 0).astype(np.int64) + qnh_correction.astype(np.int64)
+    air_pressure = np.where(QFE_present, np.char.add(" Q", _pad(QNH, 4)), "")
+
+    # Colour code, same cascade as get_ColorCode
+    d = prevailing_distance
+    h = lowest_height_above_ground
+    color_code = np.select([(d == 0) | (h == 0),
+                            ((0 < d) & (d < 800)) | ((0 < h) & (h < 200)),
+                            ((800 < d) & (d < 1600)) | ((200 <= h) & (h < 300)),
+                            ((1600 <= d) & (d < 3700)) | ((300 <= h) & (h < 700)),
+                            ((3700 <= d) & (d < 5000)) | ((700 <= h) & (h < 1500)),
+                            ((5000 <= d) & (d < 8000)) | ((1500 <= h) & (h < 2500)),
+                            (d == 8000) | ((2500 <= h) & (h < 20000)),
+                            (8000 < d) | (20000 <= h)],
+                           [" BLACK", " RED", " AMB", " YLO", " GRN", " WHT", " BLU", " BLU+"],
+                           default=" ")
+
+    return _join(report_type, report_identifier, _utc_slot_strings(timestamps, n), wind, sky,
+                 temperature, air_pressure, color_code).tolist()
+
+ENCODE_MANY_BATCH_MIN = 256    # from this many observations on, encode_batch beats the scalar loop
+ENCODE_MANY_REQUIRED = ("force", "direction_left", "direction_right", "prevailing_distance",
+                        "dry_temperature", "wet_temperature", "QFE")     # None in any of them: get_report_from_gui
+
+def encode_many(observations: list, timestamps=None) -> list:
+    # Same reports as get_report_from_gui(**observation) for each observation dict, column-wise
+    # through encode_batch for large enough lists. Missing altitudes (None) are looked up in the
+    # station catalog per column; observations of a station without a catalog altitude or with a
+    # missing measurement (None) go through get_report_from_gui one by one. The observation times
+    # come from `timestamps` (datetime64 or datetimes, one per observation), the "observation_time"
+    # of each observation or one reading of the clock.
+    import numpy as np
+    observations = list(observations)
+    if timestamps is None and any(o.get("observation_time") is not None for o in observations):
+        if all(o.get("observation_time") is not None for o in observations):
+            timestamps = [o["observation_time"] for o in observations]
+        else:
+            return [get_report_from_gui(**observation) for observation in observations]
+    if timestamps is not None:
+        timestamps = datetime64_column(timestamps)
+        if timestamps.size != len(observations):
+            raise ValueError(f"{timestamps.size} timestamps for {len(observations)} observations!")
+
+    now = utc_time() if timestamps is None else None
+    times = None if timestamps is None else timestamps.astype(datetime)
+
+    def scalar(indices) -> list:
+        return [get_report_from_gui(**dict(observations[i], observation_time=now if times is None else times[i]))
+                for i in indices]
+
+    everything = range(len(observations))
+    if len(observations) < ENCODE_MANY_BATCH_MIN:
+        return scalar(everything)
+    try:
+        complete = [i for i, o in enumerate(observations)
+                    if all(o[name] is not None for name in ENCODE_MANY_REQUIRED)
+                    and all(c["height"] is not None for c in o["cloud_list"])]
+        altitudes = {}
+        missing_altitude = [i for i in complete if observations[i]["station_altitude"] is None]
+        if missing_altitude:
+            from src.stations.catalog import station_catalog
+            catalog_altitudes, _ = station_catalog().constant_columns([observations[i]["station_identifier"] for i in missing_altitude])
+            altitudes = {i: altitude for i, altitude in zip(missing_altitude, catalog_altitudes.tolist()) if not math.isnan(altitude)}
+            if len(altitudes) < len(missing_altitude):
+                complete = [i for i in complete if observations[i]["station_altitude"] is not None or i in altitudes]
+        if len(complete) < ENCODE_MANY_BATCH_MIN:
+            return scalar(everything)
+        batch = [observations[i] for i in complete]
+        n_layers = max(len(o["cloud_list"]) for o in batch)
+        if n_layers == 0:
+            return scalar(everything)
+        empty = {"crowd": "", "height": 0, "thundercloud": ""}
+        layers = [list(o["cloud_list"]) + [empty] * (n_layers - len(o["cloud_list"])) for o in batch]
+        columns = {name: [o[name] for o in batch]
+                   for name in ("type_of_report", "station_identifier", "station_altitude", "force", "direction_left",
+                                "direction_right", "gusts", "prevailing_distance", "smallest_distance", "smallest_direction",
+                                "weather_phenomena", "dry_temperature", "wet_temperature", "QFE")}
+        columns["smallest_direction"] = ["" if d is None else d for d in columns["smallest_direction"]]
+        if altitudes:
+            columns["station_altitude"] = [altitudes.get(i, altitude) for i, altitude in zip(complete, columns["station_altitude"])]
+        encoded = encode_batch(**columns,
+                               cloud_crowd=[[c["crowd"] for c in l] for l in layers],
+                               cloud_height=[[c["height"] for c in l] for l in layers],
+                               cloud_thundercloud=[[c["thundercloud"] for c in l] for l in layers],
+                               timestamps=now if times is None else timestamps[complete])
+    except (KeyError, TypeError):
+        return scalar(everything)
+    reports = [None] * len(observations)
+    for i, report in zip(complete, encoded):
+        reports[i] = report
+    if len(complete) < len(observations):
+        incomplete = [i for i in everything if reports[i] is None]
+        for i, report in zip(incomplete, scalar(incomplete)):
+            reports[i] = report
+    return reports
+
+# ---------------------------------------------------------------------------
+# Decoding: report strings back into observations
+# ---------------------------------------------------------------------------
+
+REPORT_PATTERN = re.compile(r"""
+    (METAR|MET1)?
+    (?:\ ([A-Z]{4}))?
+    \ (\d{2})(\d{2})(\d{2})Z
+    \ (?:(P99)|VRB(\d{2,})KT|(\d{3})(\d{2,})(?:G(\d{2,}))?KT(?:\ (\d{3})V(\d{3}))?)
+    (?:\ (CAVOK)
+      |\ (\d{4})(?:\ (\d{4})([NSEW]{1,2}))?
+       ((?:\ (?!(?:FEW|SCT|BKN|OVC)\d{3})[^\ ]+)*?)
+       ((?:\ (?:FEW|SCT|BKN|OVC)\d{3}(?:TCU|CB)?)*))
+    (?:\ (M?\d{2,})/(M?\d{2,}|//))?
+    (?:\ Q(\d{4,}))?
+    \ (BLACK|RED|AMB|YLO|GRN|WHT|BLU\+?)?
+    """, re.VERBOSE)
+CLOUD_PATTERN = re.compile(r"(FEW|SCT|BKN|OVC)(\d{3})(TCU|CB)?")
+
+@dataclass
+class DecodedReport:
+    type_of_report: str
+    station_identifier: str
+    day: int
+    hour: int
+    minute: int
+    force: Optional[int]                    # in Knots, None for P99
+    direction_mean: Optional[int]           # in degrees, None for VRB and P99
+    direction_left: Optional[int]           # in degrees, only with a variable direction group
+    direction_right: Optional[int]          # in degrees, only with a variable direction group
+    gusts: Optional[int]                    # in Knots
+    variable: bool
+    above_99: bool
+    cavok: bool
+    prevailing_distance: Optional[int]      # in meters
+    smallest_distance: Optional[int]        # in meters
+    smallest_direction: str
+    weather_phenomena: str
+    cloud_list: list                        # {"crowd", "height" in ft, "thundercloud"}
+    temperature: Optional[float]            # in degrees, rounded
+    dewPoint: Optional[float]               # in degrees, rounded
+    QNH: Optional[int]                      # in hPa
+    color_code: str
+
+def _decode_temperature(s: str) -> Optional[float]:
+    # float so that "M00" (a temperature rounded up to zero) keeps its sign as -0.0
+    if s is None or s == "//":
+        return None
+    return -float(s[1:]) if s[0] == "M" else float(s)
+
+def parse_report(report: str) -> DecodedReport:
+    m = REPORT_PATTERN.fullmatch(report)
+    if m is None:
+        raise ValueError(report + " is not a Valid Report!")
+    (type_of_report, station_identifier, day, hour, minute,
+     above_99, vrb_force, direction_mean, force, gusts, direction_left, direction_right,
+     cavok, prevailing_distance, smallest_distance, smallest_direction, weather, clouds,
+     temperature, dewPoint, QNH, color_code) = m.groups()
+    # positional arguments, in field order: this is the hot loop of parse_many
+    return DecodedReport(type_of_report or "",
+                         station_identifier or "",
+                         int(day), int(hour), int(minute),
+                         None if above_99 else int(vrb_force or force),
+                         int(direction_mean) if direction_mean else None,
+                         int(direction_left) if direction_left else None,
+                         int(direction_right) if direction_right else None,
+                         int(gusts) if gusts else None,
+                         vrb_force is not None,
+                         above_99 is not None,
+                         cavok is not None,
+                         int(prevailing_distance) if prevailing_distance else None,
+                         int(smallest_distance) if smallest_distance else None,
+                         smallest_direction or "",
+                         weather[1:] if weather else "",
+                         [{"crowd": crowd, "height": int(height)*100, "thundercloud": thundercloud}
+                          for crowd, height, thundercloud in CLOUD_PATTERN.findall(clouds)] if clouds else [],
+                         _decode_temperature(temperature),
+                         _decode_temperature(dewPoint),
+                         int(QNH) if QNH else None,
+                         color_code or "")
+
+def parse_many(lines, skip_invalid: bool = False):
+    # generator over any iterable of report lines (e.g. an open file), one DecodedReport per line
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        try:
+            yield parse_report(line)
+        except ValueError:
+            if not skip_invalid:
+                raise
+
+def _encode_temperature(temperature: Optional[float]) -> str:
+    if temperature is None:
+        return "//"
+    if math.copysign(1, temperature) < 0:
+        return "M" + string_zero_padding(string=str(int(-temperature)), total_length=2)
+    return string_zero_padding(string=str(int(temperature)), total_length=2)
+
+def get_report_from_decoded(decoded: DecodedReport) -> str:
+    # inverse of parse_report: parse_report(s) re-encodes to s
+    report_string = decoded.type_of_report
+    if decoded.station_identifier:
+        report_string += " " + decoded.station_identifier
+    report_string += " " + string_zero_padding(string=str(decoded.day), total_length=2) + \
+                     string_zero_padding(string=str(decoded.hour), total_length=2) + \
+                     string_zero_padding(string=str(decoded.minute), total_length=2) + "Z"
+    
+    if decoded.above_99:
+        report_string += " P99"
+    elif decoded.variable:
+        report_string += " VRB" + string_zero_padding(string=str(decoded.force), total_length=2) + "KT"
+    else:
+        report_string += " " + string_zero_padding(string=str(decoded.direction_mean), total_length=3) + \
+                         string_zero_padding(string=str(decoded.force), total_length=2)
+        if decoded.gusts is not None:
+            report_string += "G" + string_zero_padding(string=str(decoded.gusts), total_length=2)
+        report_string += "KT"
+        if decoded.direction_left is not None:
+            report_string += " " + string_zero_padding(string=str(decoded.direction_left), total_length=3) + \
+                             "V" + string_zero_padding(string=str(decoded.direction_right), total_length=3)
+    
+    if decoded.cavok:
         report_string += " CAVOK"
     else:
-        report_string += visibility.report_string
-        report_string += weather.report_string
-        report_string += clouds.report_string
+        report_string += " " + string_zero_padding(string=str(decoded.prevailing_distance), total_length=4)
+        if decoded.smallest_distance is not None:
+            report_string += " " + string_zero_padding(string=str(decoded.smallest_distance), total_length=4) + decoded.smallest_direction
+        if decoded.weather_phenomena:
+            report_string += " " + decoded.weather_phenomena
+        for c in decoded.cloud_list:
+            report_string += " " + c["crowd"] + string_zero_padding(string=str(c["height"]//100), total_length=3) + c["thundercloud"]
     
-    report_string += temperature_and_dewPoint.report_string
-    report_string += airPressure.report_string
-    report_string += get_ColorCode(station.altitude, visibility.prevailing_distance, clouds.cloud_list)
-
+    if decoded.temperature is not None:
+        report_string += " " + _encode_temperature(decoded.temperature) + "/" + _encode_temperature(decoded.dewPoint)
+    if decoded.QNH is not None:
+        report_string += " Q" + string_zero_padding(string=str(decoded.QNH), total_length=4)
+    report_string += " " + decoded.color_code
     return report_string
 
+# ---------------------------------------------------------------------------
+# Import time
+# ---------------------------------------------------------------------------
+
+IMPORT_TIME_BUDGET_MS = 60   # numpy alone costs more than this
+
+def import_profile(module: str = "metar") -> list:
+    # (cumulative_us, self_us, name) for every module imported by a fresh `import <module>`, from -X importtime
+    import os
+    import subprocess
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return entries
+
+def import_time_ms(entries: list, module: str = "metar") -> float:
+    return max(cumulative_us for cumulative_us, _, name in entries if name.strip() == module) / 1000
+
+def print_import_profile(module: str = "metar", top: int = 15, repeat: int = 3) -> float:
+    # keep the fastest of a few fresh interpreters, the first one also pays for writing .pyc files
+    entries = min((import_profile(module) for _ in range(repeat)), key=lambda e: import_time_ms(e, module))
+    print(f"{'cumulative [ms]':>16} {'self [ms]':>10}  module")
+    for cumulative_us, self_us, name in sorted(entries, reverse=True)[:top]:
+        print(f"{cumulative_us/1000:16.2f} {self_us/1000:10.2f}  {name}")
+    total_ms = import_time_ms(entries, module)
+    print(f"import {module}: {total_ms:.2f} ms")
+    return total_ms
+
 if __name__ == '__main__':
-    # Load Default Report Configuration File
-    cfg = yaml.safe_load(open("config/default_Report.yaml"))
+    # python -m metar encode [input] [-o output] [--workers N]: streaming batch encoder
+    if len(sys.argv) > 1 and sys.argv[1] == "encode":
+        from src.engine.stream_encode import main
+        sys.exit(main(sys.argv[2:]))
+    
+    import argparse
+    parser = argparse.ArgumentParser(description="METAR report encoder (python -m metar encode --help for the batch encoder)")
+    parser.add_argument("--import-profile", action="store_true", help="show where `import metar` spends its time")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_TIME_BUDGET_MS, help="fail if `import metar` takes longer (ms)")
+    args = parser.parse_args()
+    
+    if args.import_profile:
+        total_ms = print_import_profile()
+        if total_ms > args.import_budget:
+            print(f"over budget: {total_ms:.2f} ms > {args.import_budget:.2f} ms")
+            sys.exit(1)
+        sys.exit(0)
     
     # Run Report Computation
     save_report_history = False
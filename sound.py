@@ -1,24 +1,76 @@
 import os
 import sys
-from multiprocessing import Manager
-from src.utils.logger import CLOG
-from playsound import playsound
 import time
+import multiprocessing as mp
+from src.utils.logger import CLOG, attachLogQueue
+from src.utils.shared_state import SharedState
+from src.utils.audio import PCMPlayer
 
-def runSOUND(guiState, soundState, silence):
-    sound = Sound(guiState, soundState, silence)
+SOUND_LANA = 'Lana'
+SOUND_SHUTDOWN = 'shutdown'
+
+def runSOUND(guiState, soundState, soundQueue, silence, nullSink=False, logQueue=None):
+    if logQueue is not None:
+        attachLogQueue(logQueue)
+    sound = Sound(guiState, soundState, soundQueue, silence, nullSink)
     sound.run()
     sound.shutdown()
 
-def soundStateInit(soundState):
+SOUND_STATE_LAYOUT = {'Lana': bool}     # True while the sound is playing
+
+def soundStateInit(soundState=None):
+    # creates the shared state block when none is given (a dict-like state is still accepted)
+    if soundState is None:
+        soundState = SharedState(SOUND_STATE_LAYOUT)
     soundState['Lana'] = False
+    return soundState
+
+def soundPath(name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), name + '.mp3')
+
+class SoundQueue():
+    # GUI -> SOUND requests, the SOUND process sleeps on it until there is work.
+    # The first request of a process is also sent through the `wanted` pipe, so that
+    # a launcher can start the SOUND process lazily (wait on `wanted` next to the GUI sentinel).
+    def __init__(self):
+        self.queue = mp.Queue()
+        self.wanted, self._wantedWriter = mp.Pipe(duplex=False)
+        self._announced = False
+
+    def put(self, item):
+        if not self._announced:
+            self._announced = True
+            self._wantedWriter.send(item[0])
+        self.queue.put(item)
+
+    def get(self):
+        return self.queue.get()
+
+def soundQueueInit():
+    return SoundQueue()
+
+def requestSound(soundQueue, name=SOUND_LANA):
+    soundQueue.put((name, time.monotonic()))
+
+def requestSoundShutdown(soundQueue):
+    soundQueue.put((SOUND_SHUTDOWN, time.monotonic()))
 
 class Sound():
-    def __init__(self, guiState, soundState, silence=False, parent=None):
+    def __init__(self, guiState, soundState, soundQueue, silence=False, nullSink=False, parent=None):
         # COMMUNICATION BETWEEN THREADS
         self.guiState = guiState
         self.soundState = soundState
+        self.soundQueue = soundQueue
         self.cl = CLOG(processName="SOUND", timed=True, silence=silence)
+        self.latency = None     # seconds from the last request to its wakeup
+        
+        # decode the sounds once at startup, playback then never blocks the loop
+        self.players = {}
+        try:
+            self.players[SOUND_LANA] = PCMPlayer(soundPath(SOUND_LANA), null_sink=nullSink,
+                                                 on_finished=lambda: self.finished(SOUND_LANA))
+        except Exception as e:
+            self.cl.log(f'Pre-decoded playback unavailable ({e}), falling back to playsound')
         
     def run(self):
         self.cl.log('Starting up')
@@ -26,14 +78,31 @@ class Sound():
     
     def soundCheckLoop(self):
         while (True):
-            if self.soundState['Lana']:
-                self.soundState['Lana'] = False
-                playsound('Lana.mp3')
-            
-            time.sleep(0.2)
-            
-            if self.guiState['shutdown']:
+            name, requested_at = self.soundQueue.get()
+            self.latency = time.monotonic() - requested_at
+            if name == SOUND_SHUTDOWN:
                 break
+            self.play(name)
+    
+    def play(self, name):
+        if name in self.players:
+            # coalesced if the sound is still playing, the flag is then already set
+            if self.players[name].play():
+                self.soundState[name] = True
+        else:
+            from playsound import playsound
+            self.soundState[name] = True
+            playsound(soundPath(name))
+            self.soundState[name] = False
+
+    def finished(self, name):
+        # called from the playback device thread
+        self.soundState[name] = False
   
     def shutdown(self):
+        for name, player in self.players.items():
+            if player.latencies:
+                self.cl.log(f'{name}: {player.triggered} requests, {player.coalesced} coalesced, '
+                            f'trigger to audio max {max(player.latencies)*1e3:.1f} ms')
+            player.close()
         self.cl.log('Graceful shutdown')
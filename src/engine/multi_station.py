@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import metar
+
+MIN_PARALLEL = 256      # fewer observations are encoded in-process, a pool round trip costs more than encoding them
+
+def encode_chunk(observations: list) -> list:
+    # runs in the pool workers: one chunk of get_report_from_gui argument dicts
+    return [metar.get_report_from_gui(**observation) for observation in observations]
+
+def split(items: list, n_chunks: int) -> list:
+    # n_chunks contiguous chunks of nearly equal size, in order
+    size, extra = divmod(len(items), n_chunks)
+    chunks, start = [], 0
+    for i in range(n_chunks):
+        end = start + size + (i < extra)
+        if end > start:
+            chunks.append(items[start:end])
+        start = end
+    return chunks
+
+def format_bulletin(reports: list, heading: Optional[str] = None) -> str:
+    # one report per line, each terminated by "=", under an optional heading line
+    lines = [heading] if heading else []
+    lines += [report + "=" for report in reports]
+    return "\n".join(lines) + "\n"
+
+
+class MultiStationEngine():
+    # Encodes the observations of many stations (dicts with the arguments of
+    # metar.get_report_from_gui) concurrently on a pool of worker processes.
+    # Results come back in the order of the observations. The pool is started on first
+    # use and kept until close(); workers=1 (or fewer than min_parallel observations)
+    # encodes in the calling process. Observations without an observation_time all get the
+    # same clock reading, taken here and not in the workers (which may not share metar.set_clock),
+    # so that the reports of one call never straddle a slot.
+    def __init__(self, workers: Optional[int] = None, chunks_per_worker: int = 4,
+                 min_parallel: int = MIN_PARALLEL, mp_context=None) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker
+        self.min_parallel = min_parallel
+        self.mp_context = mp_context
+        self._pool = None
+
+    def encode(self, observations: list) -> list:
+        now = metar.utc_time()
+        observations = [o if o.get("observation_time") is not None else dict(o, observation_time=now)
+                        for o in observations]
+        if self.workers == 1 or len(observations) < self.min_parallel:
+            return encode_chunk(observations)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self.mp_context)
+        reports = []
+        for chunk in self._pool.map(encode_chunk, split(observations, self.workers * self.chunks_per_worker)):
+            reports += chunk
+        return reports
+
+    def bulletin(self, observations: list, heading: Optional[str] = None) -> str:
+        return format_bulletin(self.encode(observations), heading)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,128 @@
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Optional
+
+import metar
+from src.engine.stream_encode import read_observations
+from src.history.writer import HistoryWriter
+from src.utils.stage_timing import StageHistogram
+
+DEFAULT_SPEED = 100     # simulated seconds per real second, 0 replays as fast as possible
+
+class SimulatedClock():
+    # clock for metar.set_clock that only moves when the replay moves it
+    def __init__(self, now: Optional[datetime] = None) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def session_slots(observations):
+    # generator over (slot time, {station: observation}) for a session in time order: each report
+    # slot gets the newest observation of every station made up to the slot (the GUI state an
+    # operator would have encoded at that time), the last slot those made after the last full slot
+    latest = {}
+    slot = None
+    for observation in observations:
+        if observation.get("observation_time") is None:
+            raise ValueError(str(observation) + " is not a Valid Session Observation (no observation_time)!")
+        t = metar.utc_time(observation["observation_time"])
+        if slot is None:
+            slot = metar.next_slot_time(t)
+        while t > slot:
+            if latest:
+                yield slot, dict(latest)
+            slot = metar.next_slot_time(slot)
+        latest[observation["station_identifier"]] = observation
+    if latest:
+        yield slot, latest
+
+def replay(observations, speed: float = DEFAULT_SPEED, history_folder: str = "", backend: str = "text",
+           silence: bool = True) -> dict:
+    # Drives get_report_from_gui and a HistoryWriter on a simulated clock, one slot after the other.
+    # A slot is due (slot - first slot) / speed seconds after the start; one still unstarted when
+    # the next slot is due is dropped, as its reports would already be out of date. Latency runs
+    # from the slot being due to the report being handed to the history writer. The session is
+    # grouped into slots before the clock starts, so that reading it is not measured.
+    slot_snapshots = list(session_slots(observations))
+    clock = SimulatedClock()
+    latency = StageHistogram()
+    writer = HistoryWriter(backend=backend, silence=silence)
+    slots = reports = dropped = 0
+    busy = 0.0
+    first_slot = None
+    metar.set_clock(clock)
+    start = time.perf_counter()
+    try:
+        for slot, snapshot in slot_snapshots:
+            if first_slot is None:
+                first_slot = slot
+            slots += 1
+            if speed:
+                due = start + (slot - first_slot).total_seconds() / speed
+                now = time.perf_counter()
+                if now < due:
+                    time.sleep(due - now)
+                elif now > start + (metar.next_slot_time(slot) - first_slot).total_seconds() / speed:
+                    dropped += len(snapshot)
+                    continue
+            else:
+                due = time.perf_counter()
+            clock.now = slot
+            saved_at = slot.astimezone().replace(tzinfo=None)      # the history is in local time
+            begin = time.perf_counter()
+            for observation in snapshot.values():
+                writer.write(history_folder, metar.get_report_from_gui(**dict(observation, observation_time=None)), saved_at)
+                latency.add(int((time.perf_counter() - due) * 1e9))
+                reports += 1
+            busy += time.perf_counter() - begin
+        writer.close()
+    finally:
+        metar.set_clock(None)
+    elapsed = time.perf_counter() - start
+    return {"slots": slots,
+            "reports": reports,
+            "dropped": dropped,
+            "written": writer.written,
+            "simulated_s": (slot_snapshots[-1][0] - first_slot).total_seconds() if slot_snapshots else 0,
+            "elapsed_s": elapsed,
+            "reports_per_s": reports / elapsed if elapsed else 0,
+            "busy_reports_per_s": reports / busy if busy else 0,
+            "latency": latency.summary()}
+
+def format_results(results: dict) -> str:
+    lines = [f"{results['slots']} slots, {results['reports']} reports, {results['dropped']} dropped, "
+             f"{results['written']} written to the history",
+             f"{results['simulated_s']/3600:.1f} h simulated in {results['elapsed_s']:.2f} s, "
+             f"{results['reports_per_s']:,.0f} reports/s ({results['busy_reports_per_s']:,.0f} reports/s while encoding)"]
+    s = results["latency"]
+    if s["count"]:
+        lines.append(f"latency p50 {s['p50_us']:.0f} us, p90 {s['p90_us']:.0f} us, p99 {s['p99_us']:.0f} us, max {s['max_us']:.0f} us")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay a recorded session (CSV or JSON lines observations with an "
+                                                 "observation_time) through the encoder and the history writer")
+    parser.add_argument('session', help="session file, - for stdin")
+    parser.add_argument('--speed', type=float, default=DEFAULT_SPEED, help="times real time, 0 for as fast as possible (default: 100)")
+    parser.add_argument('--history', default=None, help="history folder (default: a temporary folder)")
+    parser.add_argument('--backend', choices=["text", "sqlite"], default="text")
+    parser.add_argument('--format', choices=["auto", "csv", "jsonl"], default="auto")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.session == "-" else open(args.session, newline="", encoding="utf-8")
+    try:
+        if args.history is None:
+            with tempfile.TemporaryDirectory() as folder:
+                results = replay(read_observations(source, args.format), args.speed, folder, args.backend)
+        else:
+            results = replay(read_observations(source, args.format), args.speed, args.history, args.backend)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(format_results(results))
@@ -0,0 +1,147 @@
+import json
+import math
+import argparse
+import threading
+from typing import Optional
+
+import metar
+from src.history.writer import HistoryWriter
+from src.utils.logger import CLOG
+from src.utils.stage_timing import StageHistogram
+
+MAX_WAIT_S = 60     # longest single wait: monotonic timers stop while the machine is suspended,
+                    # so a wait is re-armed from the wall clock at least this often
+
+def timer_ms(seconds: float) -> int:
+    # for millisecond timers (QTimer): rounded up, a timer firing before the slot would only be re-armed
+    return math.ceil(min(seconds, MAX_WAIT_S) * 1000)
+
+
+class SlotScheduler():
+    # Encodes the current observation at every report slot (metar.next_slot_time) and hands the
+    # reports to a HistoryWriter, without anyone pressing GET REPORT.
+    # The timer belongs to the caller (a QTimer in the GUI, a thread in start()): it waits
+    # seconds_to_next_slot() on a monotonic timer and calls on_timer(), which encodes once the slot
+    # is reached on the wall clock and otherwise only asks to be re-armed.
+    # snapshot() returns the get_report_from_gui arguments (a dict, a list of them for several
+    # stations, or None to skip the slot), read when the slot fires. history_folder is a folder
+    # or a function returning it. on_report(slot, report) is called for every report.
+    # Catch-up: when the wake-up comes a slot or more late (suspend, overloaded machine), only the
+    # latest due slot is reported, stamped with its slot time; the slots before it are counted as
+    # missed instead of being back-filled with an observation that was not made at their time.
+    def __init__(self, snapshot, writer: HistoryWriter, history_folder="", on_report=None,
+                 clock=metar.wall_clock, silence: bool = False) -> None:
+        self.snapshot = snapshot
+        self.writer = writer
+        self.history_folder = history_folder
+        self.on_report = on_report
+        self.clock = clock
+        self.cl = CLOG(processName="SCHEDULER", timed=True, silence=silence)
+        self.next_slot = metar.next_slot_time(clock())
+        self.fired = 0
+        self.missed = 0
+        self.failed = 0
+        self.reports = 0
+        self.jitter = StageHistogram()      # slot to wake-up, in ns
+        self.latency = StageHistogram()     # slot to the reports handed to the writer, in ns
+        self._stop = None
+        self._thread = None
+
+    def seconds_to_next_slot(self) -> float:
+        return max(0.0, (self.next_slot - self.clock()).total_seconds())
+
+    def on_timer(self) -> list:
+        # the reports of the slot that is due, [] when the timer fired early (re-arm it)
+        now = self.clock()
+        if now < self.next_slot:
+            return []
+        slot = self.next_slot
+        following = metar.next_slot_time(slot)
+        missed = 0
+        while following <= now:
+            missed += 1
+            slot, following = following, metar.next_slot_time(following)
+        if missed:
+            self.missed += missed
+            self.cl.warning("%d slot(s) missed from %s, reporting %s %.0f s late",
+                            missed, self.next_slot.strftime("%H:%MZ"), slot.strftime("%H:%MZ"), (now - slot).total_seconds())
+        self.next_slot = following
+        self.fired += 1
+        self.jitter.add(int((now - slot).total_seconds() * 1e9))
+        try:
+            inputs = self.snapshot()
+            if inputs is None:
+                return []
+            observations = inputs if isinstance(inputs, list) else [inputs]
+            reports = [metar.get_report_from_gui(**dict(o, observation_time=slot)) for o in observations]
+        except (ValueError, TypeError, KeyError, OSError) as e:
+            self.failed += 1
+            self.cl.error("slot %s not reported: %s", slot.strftime("%H:%MZ"), e)
+            return []
+        folder = self.history_folder() if callable(self.history_folder) else self.history_folder
+        saved_at = slot.astimezone().replace(tzinfo=None)      # the history is in local time
+        for report in reports:
+            self.writer.write(folder, report, saved_at)
+        self.latency.add(int((self.clock() - slot).total_seconds() * 1e9))
+        self.reports += len(reports)
+        for report in reports:
+            if self.on_report is not None:
+                self.on_report(slot, report)
+        self.cl.debug("slot %s fired %.2f ms late, %d report(s)", slot.strftime("%H:%MZ"), (now - slot).total_seconds() * 1e3, len(reports))
+        return reports
+
+    def stats(self) -> dict:
+        return {"fired": self.fired, "missed": self.missed, "failed": self.failed, "reports": self.reports,
+                "jitter": self.jitter.summary(), "latency": self.latency.summary()}
+
+    def log(self) -> None:
+        s = self.stats()
+        line = f"{s['fired']} slots fired, {s['missed']} missed, {s['failed']} failed, {s['reports']} reports"
+        if s["jitter"]["count"]:
+            line += f", jitter p50 {s['jitter']['p50_us']/1e3:.2f} ms p99 {s['jitter']['p99_us']/1e3:.2f} ms max {s['jitter']['max_us']/1e3:.2f} ms"
+        self.cl.log(line)
+
+    # headless timer: a thread waiting on an Event (monotonic) until the next slot
+
+    def start(self) -> None:
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="SlotScheduler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(min(self.seconds_to_next_slot(), MAX_WAIT_S)):
+            self.on_timer()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def read_observation_file(path: str):
+    # the latest observation state, written by the acquisition as a JSON object (or a list, one per station)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Encode and save a report at every slot "
+                                                 f"({metar.FIRST_HOUR_REPORT} and {metar.SECOND_HOUR_REPORT} past the hour)")
+    parser.add_argument('observation', help="JSON file with the get_report_from_gui arguments, read at every slot")
+    parser.add_argument('--history', required=True, help="history folder")
+    parser.add_argument('--backend', choices=["text", "sqlite"], default="text")
+    args = parser.parse_args()
+
+    writer = HistoryWriter(backend=args.backend)
+    scheduler = SlotScheduler(lambda: read_observation_file(args.observation), writer, args.history,
+                              on_report=lambda slot, report: print(report, flush=True))
+    scheduler.cl.log(f"next slot {scheduler.next_slot.strftime('%d %H:%MZ')}")
+    scheduler.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    scheduler.stop()
+    writer.close()
+    scheduler.log()
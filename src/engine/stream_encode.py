@@ -0,0 +1,135 @@
+import io
+import sys
+import csv
+import json
+import time
+import itertools
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import metar
+
+CHUNK_SIZE = 2048           # observations per chunk, large enough for encode_batch
+IN_FLIGHT_PER_WORKER = 2    # chunks queued per worker, bounds the memory held by the pool
+MAX_CLOUD_LAYERS = 3
+
+INT_FIELDS = ("station_altitude", "force", "direction_left", "direction_right", "gusts",
+              "prevailing_distance", "smallest_distance", "QFE")
+FLOAT_FIELDS = ("dry_temperature", "wet_temperature")
+STRING_FIELDS = ("type_of_report", "station_identifier", "smallest_direction", "weather_phenomena")
+
+def _number(value: str, cast):
+    value = value.strip()
+    return None if value == "" else cast(float(value)) if cast is int else cast(value)
+
+def parse_observation_time(value):
+    # ISO 8601 ("2024-03-01T10:20", "...Z" or with an offset; naive times are UTC), empty is None (the clock)
+    if not value:
+        return None
+    return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+
+def observation_from_csv(row: dict) -> dict:
+    # CSV columns are the get_report_from_gui arguments, the cloud layers are spread over
+    # cloud1_crowd, cloud1_height, cloud1_thundercloud, cloud2_crowd, ... (empty cells are missing values),
+    # an optional observation_time column re-encodes historical observations with their own time
+    observation = {name: _number(row.get(name) or "", int) for name in INT_FIELDS}
+    observation.update({name: _number(row.get(name) or "", float) for name in FLOAT_FIELDS})
+    observation.update({name: (row.get(name) or "").strip() for name in STRING_FIELDS})
+    observation["cloud_list"] = [{"crowd": (row.get(f"cloud{i}_crowd") or "").strip(),
+                                  "height": _number(row.get(f"cloud{i}_height") or "", int) or 0,
+                                  "thundercloud": (row.get(f"cloud{i}_thundercloud") or "").strip()}
+                                 for i in range(1, MAX_CLOUD_LAYERS + 1) if f"cloud{i}_crowd" in row]
+    observation["observation_time"] = parse_observation_time(row.get("observation_time"))
+    return observation
+
+def read_observations(stream, input_format: str = "auto"):
+    # generator over the observations of a CSV or JSON-lines stream, one line at a time
+    if input_format == "auto":
+        first = stream.readline()
+        input_format = "jsonl" if first.lstrip().startswith("{") else "csv"
+        stream = itertools.chain([first], stream)
+    if input_format == "jsonl":
+        for line in stream:
+            if line.strip():
+                observation = json.loads(line)
+                observation["observation_time"] = parse_observation_time(observation.get("observation_time"))
+                yield observation
+    else:
+        for row in csv.DictReader(stream):
+            yield observation_from_csv(row)
+
+def chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def encode_chunk(observations: list) -> list:
+    # runs in the pool workers
+    return metar.encode_many(observations)
+
+def encode_stream(observations, workers: int = 1, chunk_size: int = CHUNK_SIZE):
+    # generator over the reports, in input order. At most IN_FLIGHT_PER_WORKER chunks per
+    # worker are submitted ahead of the one being written, so the input is never read whole.
+    if workers <= 1:
+        for chunk in chunked(observations, chunk_size):
+            yield from encode_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in chunked(observations, chunk_size):
+            in_flight.append(pool.submit(encode_chunk, chunk))
+            if len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+def peak_rss_mb() -> Optional[float]:
+    # peak resident set size of this process plus its largest worker, None where unknown (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1 / 2**20 if sys.platform == "darwin" else 1 / 2**10     # ru_maxrss is in bytes on macOS, KiB elsewhere
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m metar encode",
+                                     description="Encode observations (CSV or JSON lines) into report lines")
+    parser.add_argument("input", nargs="?", default="-", help="input file, - for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="output file, - for stdout (default)")
+    parser.add_argument("--format", choices=["auto", "csv", "jsonl"], default="auto", help="input format (default: guessed)")
+    parser.add_argument("--workers", type=int, default=1, help="encoding processes (default: 1, in-process)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    rows = 0
+    try:
+        buffer = io.StringIO()
+        for report in encode_stream(read_observations(source, args.format), args.workers, args.chunk_size):
+            buffer.write(report + "\n")
+            rows += 1
+            if rows % args.chunk_size == 0:
+                target.write(buffer.getvalue())
+                buffer = io.StringIO()
+        target.write(buffer.getvalue())
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+        else:
+            target.flush()
+    elapsed = time.perf_counter() - start
+    rss = peak_rss_mb()
+    print(f"{rows} rows in {elapsed:.2f} s, {rows/elapsed if elapsed else 0:,.0f} rows/s, "
+          f"peak RSS {'n/a' if rss is None else f'{rss:.0f} MiB'}", file=sys.stderr)
+    return 0
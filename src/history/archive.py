@@ -0,0 +1,165 @@
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+import metar
+from src.history.reader import read_history
+from src.history.store import slot_datetime, to_epoch
+
+ARCHIVE_METADATA_FILENAME = "archive.json"
+MAX_CLOUD_LAYERS = 3
+MISSING = -1                    # integer fields, NaN for temperatures
+APPEND_CHUNK_SIZE = 100_000
+
+# One raw little-endian file per field: name -> (dtype, shape of one report)
+FIELDS = {
+    "slot_time":            ("<i8", ()),                    # UTC seconds since epoch
+    "type_of_report":       ("<u1", ()),
+    "station":              ("<u1", ()),
+    "force":                ("<i2", ()),                    # in Knots
+    "direction_mean":       ("<i2", ()),                    # in degrees
+    "direction_left":       ("<i2", ()),
+    "direction_right":      ("<i2", ()),
+    "gusts":                ("<i2", ()),
+    "variable":             ("|b1", ()),
+    "above_99":             ("|b1", ()),
+    "cavok":                ("|b1", ()),
+    "prevailing_distance":  ("<i2", ()),                    # in meters
+    "smallest_distance":    ("<i2", ()),
+    "smallest_direction":   ("<u1", ()),
+    "weather_phenomena":    ("<u2", ()),
+    "cloud_crowd":          ("<u1", (MAX_CLOUD_LAYERS,)),
+    "cloud_height":         ("<i4", (MAX_CLOUD_LAYERS,)),   # in ft
+    "cloud_thundercloud":   ("<u1", (MAX_CLOUD_LAYERS,)),
+    "temperature":          ("<f4", ()),                    # in degrees
+    "dewPoint":             ("<f4", ()),
+    "QNH":                  ("<i2", ()),                    # in hPa
+    "color_code":           ("<u1", ()),
+}
+# categorical fields store codes into a label table kept in archive.json, code 0 is always ""
+CATEGORICAL = ["type_of_report", "station", "smallest_direction", "weather_phenomena",
+               "cloud_crowd", "cloud_thundercloud", "color_code"]
+
+def _int_or_missing(value: Optional[int]) -> int:
+    return MISSING if value is None else value
+
+def _float_or_nan(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+class ObservationArchive():
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        metadata_path = os.path.join(folder, ARCHIVE_METADATA_FILENAME)
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        else:
+            metadata = {"length": 0, "categories": {name: [""] for name in CATEGORICAL}}
+        self.length = metadata["length"]
+        self.categories = metadata["categories"]
+        self._codes = {name: {label: code for code, label in enumerate(labels)} for name, labels in self.categories.items()}
+        self._columns = None
+
+    def __len__(self) -> int:
+        return self.length
+
+    # ----- reading -----
+
+    def _open_column(self, name: str) -> np.ndarray:
+        dtype, shape = FIELDS[name]
+        if self.length == 0:
+            return np.empty((0,) + shape, dtype=dtype)
+        # the metadata length, not the file size, is authoritative: an interrupted append leaves unused bytes at the end
+        return np.memmap(os.path.join(self.folder, name + ".bin"), dtype=dtype, mode="r", shape=(self.length,) + shape)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if self._columns is None:
+            self._columns = {}
+        if name not in self._columns:
+            self._columns[name] = self._open_column(name)
+        return self._columns[name]
+
+    def labels(self, name: str) -> np.ndarray:
+        # decode a categorical column, e.g. archive.labels("station")[archive["station"]]
+        return np.array(self.categories[name])
+
+    def code(self, name: str, label: str) -> int:
+        return self._codes[name][label]
+
+    def time_slice(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> slice:
+        # rows with start <= slot_time <= end, assuming reports were appended in time order
+        slot_time = self["slot_time"]
+        lo = 0 if start is None else int(np.searchsorted(slot_time, to_epoch(start), side="left"))
+        hi = len(slot_time) if end is None else int(np.searchsorted(slot_time, to_epoch(end), side="right"))
+        return slice(lo, hi)
+
+    # ----- writing -----
+
+    def _encode_label(self, name: str, label: str) -> int:
+        codes = self._codes[name]
+        if label not in codes:
+            codes[label] = len(self.categories[name])
+            self.categories[name].append(label)
+        return codes[label]
+
+    def _rows(self, slot_time: datetime, d: "metar.DecodedReport") -> tuple:
+        if len(d.cloud_list) > MAX_CLOUD_LAYERS:
+            raise ValueError(f"{len(d.cloud_list)} cloud layers do not fit the archive ({MAX_CLOUD_LAYERS} max)!")
+        clouds = d.cloud_list + [{"crowd": "", "height": MISSING, "thundercloud": ""}] * (MAX_CLOUD_LAYERS - len(d.cloud_list))
+        return (to_epoch(slot_time),
+                self._encode_label("type_of_report", d.type_of_report),
+                self._encode_label("station", d.station_identifier),
+                _int_or_missing(d.force), _int_or_missing(d.direction_mean),
+                _int_or_missing(d.direction_left), _int_or_missing(d.direction_right),
+                _int_or_missing(d.gusts),
+                d.variable, d.above_99, d.cavok,
+                _int_or_missing(d.prevailing_distance), _int_or_missing(d.smallest_distance),
+                self._encode_label("smallest_direction", d.smallest_direction),
+                self._encode_label("weather_phenomena", d.weather_phenomena),
+                [self._encode_label("cloud_crowd", c["crowd"]) for c in clouds],
+                [c["height"] for c in clouds],
+                [self._encode_label("cloud_thundercloud", c["thundercloud"]) for c in clouds],
+                _float_or_nan(d.temperature), _float_or_nan(d.dewPoint),
+                _int_or_missing(d.QNH),
+                self._encode_label("color_code", d.color_code))
+
+    def _append_chunk(self, rows: list) -> None:
+        for name, values in zip(FIELDS, zip(*rows)):
+            dtype, _ = FIELDS[name]
+            with open(os.path.join(self.folder, name + ".bin"), "r+b" if self.length else "wb") as f:
+                f.seek(self.length * np.dtype(dtype).itemsize * max(1, int(np.prod(FIELDS[name][1]))))
+                f.write(np.asarray(values, dtype=dtype).tobytes())
+                f.truncate()
+        self.length += len(rows)
+        self._save_metadata()
+        self._columns = None
+
+    def _save_metadata(self) -> None:
+        path = os.path.join(self.folder, ARCHIVE_METADATA_FILENAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"length": self.length, "fields": {name: [dtype, list(shape)] for name, (dtype, shape) in FIELDS.items()},
+                       "categories": self.categories}, f)
+        os.replace(path + ".tmp", path)
+
+    def append(self, records) -> int:
+        # records: iterable of (UTC slot time, metar.DecodedReport), in time order
+        appended = 0
+        rows = []
+        for slot_time, decoded in records:
+            rows.append(self._rows(slot_time, decoded))
+            if len(rows) >= APPEND_CHUNK_SIZE:
+                self._append_chunk(rows)
+                appended += len(rows)
+                rows = []
+        if rows:
+            self._append_chunk(rows)
+            appended += len(rows)
+        return appended
+
+    def import_text_history(self, path: str) -> int:
+        return self.append((slot_datetime(record.timestamp, record.report.day, record.report.hour, record.report.minute), record.report)
+                           for record in read_history(path, decode=True))
@@ -0,0 +1,120 @@
+import os
+from datetime import datetime
+from typing import NamedTuple, Optional, Union
+
+import metar
+
+HISTORY_FILENAME = "report_history.txt"
+TIMESTAMP_LENGTH = len("2023-01-31 12h50m00s")
+SEPARATOR = ": "
+BLOCK_SIZE = 64 * 1024
+
+# report_history.txt lines are written by gui.MainWindow.saveReport as
+# "<metar.get_Date_and_Time()>: <report>", in local time and in append order.
+
+class HistoryRecord(NamedTuple):
+    timestamp: datetime
+    report: Union[str, "metar.DecodedReport"]
+
+def parse_timestamp(s: str) -> datetime:
+    # "YYYY-MM-DD HHhMMmSSs", sliced instead of strptime (this runs once per line)
+    return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]), int(s[11:13]), int(s[14:16]), int(s[17:19]))
+
+def format_timestamp(t: datetime) -> str:
+    # same format as metar.get_Date_and_Time
+    return t.strftime("%Y-%m-%d %Hh%Mm%Ss")
+
+def parse_line(line: str, decode: bool = False) -> HistoryRecord:
+    line = line.rstrip("\r\n")
+    if line[TIMESTAMP_LENGTH:TIMESTAMP_LENGTH+len(SEPARATOR)] != SEPARATOR:
+        raise ValueError(line + " is not a Valid History Line!")
+    report = line[TIMESTAMP_LENGTH+len(SEPARATOR):]
+    return HistoryRecord(parse_timestamp(line), metar.parse_report(report) if decode else report)
+
+def _next_timestamp(f) -> Optional[datetime]:
+    # timestamp of the next line that has one (blank or corrupt lines are skipped), None at the end of the file
+    for line in iter(f.readline, b""):
+        try:
+            return parse_timestamp(line.decode())
+        except ValueError:
+            continue
+    return None
+
+def _seek_to_start(f, start: datetime) -> None:
+    # binary search over byte offsets for the first line at or after start; the file is in append order
+    lo, hi = 0, os.fstat(f.fileno()).st_size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        if mid > 0:
+            f.readline()                        # skip the partial line we landed in
+        timestamp = _next_timestamp(f)
+        if timestamp is None or timestamp >= start:
+            hi = mid
+        else:
+            lo = mid + 1
+    f.seek(lo)
+    if lo > 0:
+        f.readline()                            # the line starting at lo is still before start
+
+def read_history(path: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 decode: bool = False, skip_invalid: bool = True):
+    # oldest first, lazily; only the current line is held in memory
+    with open(path, "rb") as f:
+        if start is not None:
+            _seek_to_start(f, start)
+        for raw in f:
+            try:
+                record = parse_line(raw.decode(), decode=decode)
+            except ValueError:
+                if skip_invalid:
+                    continue
+                raise
+            if start is not None and record.timestamp < start:
+                continue
+            if end is not None and record.timestamp > end:
+                break
+            yield record
+
+def _reversed_lines(f, block_size: int = BLOCK_SIZE):
+    # yields lines from the end of the file, reading it backwards one block at a time
+    position = os.fstat(f.fileno()).st_size
+    remainder = b""
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        block = f.read(read_size) + remainder
+        lines = block.split(b"\n")
+        remainder = lines[0]                    # may continue in the previous block
+        for line in reversed(lines[1:]):
+            if line:
+                yield line
+    if remainder:
+        yield remainder
+
+def read_history_reversed(path: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          decode: bool = False, skip_invalid: bool = True):
+    # newest first, without scanning the part of the file before the records returned
+    with open(path, "rb") as f:
+        for raw in _reversed_lines(f):
+            try:
+                record = parse_line(raw.decode(), decode=decode)
+            except ValueError:
+                if skip_invalid:
+                    continue
+                raise
+            if end is not None and record.timestamp > end:
+                continue
+            if start is not None and record.timestamp < start:
+                break
+            yield record
+
+def last_reports(path: str, n: int, decode: bool = False) -> list:
+    # the n most recent records, oldest first
+    records = []
+    for record in read_history_reversed(path, decode=decode):
+        if len(records) >= n:
+            break
+        records.append(record)
+    return records[::-1]
@@ -0,0 +1,138 @@
+import sqlite3
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+import metar
+from src.history.reader import read_history, format_timestamp
+
+HISTORY_DATABASE_FILENAME = "report_history.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id          INTEGER PRIMARY KEY,
+    station     TEXT    NOT NULL,
+    slot_time   INTEGER NOT NULL,   -- report slot, UTC seconds since epoch
+    saved_at    TEXT    NOT NULL,   -- local time, as in report_history.txt
+    color_code  TEXT    NOT NULL,
+    report      TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_station_slot_time ON reports (station, slot_time);
+CREATE INDEX IF NOT EXISTS reports_slot_time ON reports (slot_time);
+"""
+
+class StoredReport(NamedTuple):
+    station: str
+    slot_time: datetime                 # UTC
+    saved_at: str                       # local time
+    color_code: str
+    report: str
+
+def slot_datetime(saved_at: datetime, day: int, hour: int, minute: int) -> datetime:
+    # The report only carries DDHHMMZ: take the month (previous, same or next) that puts it closest to when it was saved
+    saved_at_utc = saved_at.astimezone(timezone.utc)
+    candidates = []
+    for months in (-1, 0, 1):
+        year, month = divmod(saved_at_utc.year*12 + saved_at_utc.month-1 + months, 12)
+        try:
+            candidates.append(datetime(year, month+1, day, hour, minute, tzinfo=timezone.utc))
+        except ValueError:
+            pass                        # e.g. day 31 in a 30-day month
+    return min(candidates, key=lambda t: abs(t - saved_at_utc))
+
+def to_epoch(t: datetime) -> int:
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return int(t.timestamp())
+
+def _row(report: str, saved_at: datetime) -> tuple:
+    decoded = metar.parse_report(report)
+    slot_time = slot_datetime(saved_at, decoded.day, decoded.hour, decoded.minute)
+    return (decoded.station_identifier, int(slot_time.timestamp()), format_timestamp(saved_at), decoded.color_code, report)
+
+class HistoryStore():
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.skipped = 0                # reports that did not decode, never stored
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def append(self, report: str, saved_at: Optional[datetime] = None) -> None:
+        self.append_many([(saved_at or datetime.now(), report)])
+
+    def append_many(self, records) -> int:
+        # records: iterable of (local saved_at, report string), e.g. HistoryRecord; reports that
+        # do not decode are skipped and counted, as in import_text_history. Returns the rows stored.
+        rows = []
+        for saved_at, report in records:
+            try:
+                rows.append(_row(report, saved_at))
+            except ValueError:
+                self.skipped += 1
+        return self._insert_rows(rows)
+
+    def import_text_history(self, path: str, batch_size: int = 10000) -> int:
+        # bulk import of an existing report_history.txt; lines that do not decode are skipped
+        imported = 0
+        batch = []
+        for record in read_history(path):
+            try:
+                batch.append(_row(record.report, record.timestamp))
+            except ValueError:
+                self.skipped += 1
+                continue
+            if len(batch) >= batch_size:
+                imported += self._insert_rows(batch)
+                batch = []
+        imported += self._insert_rows(batch)
+        return imported
+
+    def _insert_rows(self, rows: list) -> int:
+        with self.connection:
+            self.connection.executemany("INSERT INTO reports (station, slot_time, saved_at, color_code, report) VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def query(self, station: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        # reports with start <= slot time <= end (UTC, naive datetimes are taken as UTC), oldest first
+        conditions, parameters = [], []
+        if station is not None:
+            conditions.append("station = ?")
+            parameters.append(station)
+        if start is not None:
+            conditions.append("slot_time >= ?")
+            parameters.append(to_epoch(start))
+        if end is not None:
+            conditions.append("slot_time <= ?")
+            parameters.append(to_epoch(end))
+        sql = "SELECT station, slot_time, saved_at, color_code, report FROM reports"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY slot_time, id"
+        for station, slot_time, saved_at, color_code, report in self.connection.execute(sql, parameters):
+            yield StoredReport(station, datetime.fromtimestamp(slot_time, timezone.utc), saved_at, color_code, report)
+
+    def stations(self) -> list:
+        return [station for station, in self.connection.execute("SELECT DISTINCT station FROM reports ORDER BY station")]
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="import a report_history.txt into an indexed history store")
+    parser.add_argument("text_history")
+    parser.add_argument("database", nargs="?", default=HISTORY_DATABASE_FILENAME)
+    args = parser.parse_args()
+    with HistoryStore(args.database) as store:
+        print(f"imported {store.import_text_history(args.text_history)} reports into {args.database}")
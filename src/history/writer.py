@@ -0,0 +1,100 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from src.utils.logger import CLOG
+from src.history.reader import HISTORY_FILENAME, format_timestamp
+from src.history.store import HistoryStore, HISTORY_DATABASE_FILENAME
+
+_STOP = object()
+
+class HistoryWriter():
+    # Appends reports to the history folder from a background thread, so that a slow
+    # (e.g. network mounted) history path never blocks the caller.
+    # A batch is written once flush_every records are buffered or flush_interval_ms after
+    # the first buffered record, whichever comes first; fsync=True also syncs every batch.
+    def __init__(self, backend: str = "text", flush_every: int = 16, flush_interval_ms: float = 200,
+                 fsync: bool = False, silence: bool = False) -> None:
+        if backend not in ("text", "sqlite"):
+            raise Exception(backend + " is not a Valid History Backend (text, sqlite)!")
+        self.backend = backend
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval_ms / 1000
+        self.fsync = fsync
+        self.cl = CLOG(processName="HISTORY", timed=True, silence=silence)
+        self.queue = queue.Queue()
+        self.written = 0
+        self._stores = {}
+        self._thread = threading.Thread(target=self._run, name="HistoryWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, history_folder: str, report: str, saved_at: Optional[datetime] = None) -> None:
+        # never blocks: the record is only queued
+        self.queue.put((history_folder, saved_at or datetime.now(), report))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        # writes everything still queued, then stops the thread
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        buffer = []
+        deadline = None
+        while True:
+            try:
+                item = self.queue.get(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(buffer)
+                break
+            if item is not None:
+                buffer.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if item is None or len(buffer) >= self.flush_every:
+                self._flush(buffer)
+                buffer = []
+                deadline = None
+        for store in self._stores.values():
+            store.close()
+
+    def _flush(self, buffer: list) -> None:
+        by_folder = {}
+        for history_folder, saved_at, report in buffer:
+            by_folder.setdefault(history_folder, []).append((saved_at, report))
+        for history_folder, records in by_folder.items():
+            if len(history_folder) == 0 or not os.path.exists(history_folder):
+                continue
+            try:
+                if self.backend == "sqlite":
+                    written = self._write_sqlite(history_folder, records)
+                else:
+                    written = self._write_text(history_folder, records)
+                self.written += written
+                if written < len(records):
+                    self.cl.log(f"skipped {len(records) - written} reports that do not decode in {history_folder}")
+            except (OSError, ValueError, sqlite3.Error) as e:
+                self.cl.log(f"could not write {len(records)} reports to {history_folder}: {e}")
+
+    def _write_text(self, history_folder: str, records: list) -> int:
+        with open(os.path.join(history_folder, HISTORY_FILENAME), "a") as text_file:
+            text_file.write("".join(format_timestamp(saved_at) + ": " + report + "\n" for saved_at, report in records))
+            if self.fsync:
+                text_file.flush()
+                os.fsync(text_file.fileno())
+        return len(records)
+
+    def _write_sqlite(self, history_folder: str, records: list) -> int:
+        # reports that do not decode are skipped one by one (HistoryStore.append_many), not with their batch
+        if history_folder not in self._stores:
+            # opened here so that the connection belongs to the writer thread
+            store = HistoryStore(os.path.join(history_folder, HISTORY_DATABASE_FILENAME))
+            if self.fsync:
+                store.connection.execute("PRAGMA synchronous=FULL")
+            self._stores[history_folder] = store
+        return self._stores[history_folder].append_many(records)
@@ -0,0 +1,176 @@
+import json
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import metar
+from src.utils.logger import CLOG
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BATCH = 512         # observations encoded together at most
+MAX_DELAY_MS = 0.0      # how long a batch waits for more requests once the queue is empty
+WAIT_MIN = metar.ENCODE_MANY_BATCH_MIN // 2     # smaller batches never wait: they would not reach the
+                                                # encode_batch crossover, waiting would only add latency
+
+class MicroBatcher():
+    # Collects the observations of concurrent requests and encodes them together
+    # (metar.encode_many) on an encoding thread, so the event loop keeps accepting and reading
+    # requests meanwhile: the requests arriving during one encoding make up the next batch.
+    # A batch takes at most max_batch observations; with max_delay_ms, one of WAIT_MIN or more
+    # observations waits that long for more. max_batch=1 encodes every request on its own.
+    def __init__(self, max_batch: int = MAX_BATCH, max_delay_ms: float = MAX_DELAY_MS) -> None:
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.queue = None       # created in run(): before Python 3.10 a Queue is bound to the loop of its creation
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode")
+        self.batches = 0
+        self.encoded = 0
+
+    async def encode(self, observations: list) -> list:
+        if self.queue is None:
+            raise RuntimeError("MicroBatcher.run() is not running!")
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((observations, future))
+        return await future
+
+    def _drain(self, batch: list, count: int) -> int:
+        while count < self.max_batch and not self.queue.empty():
+            item = self.queue.get_nowait()
+            batch.append(item)
+            count += len(item[0])
+        return count
+
+    async def run(self) -> None:
+        self.queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                count = self._drain(batch, len(batch[0][0]))
+                if WAIT_MIN <= count < self.max_batch and self.max_delay > 0:
+                    await asyncio.sleep(self.max_delay)
+                    count = self._drain(batch, count)
+                # the futures belong to the loop: results are set here, not on the encoding thread
+                results = await loop.run_in_executor(self.executor, self._encode, [observations for observations, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    if future.done():
+                        continue        # the client is gone
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+                self.batches += 1
+                self.encoded += count
+        finally:
+            self.executor.shutdown(wait=False)
+
+    @staticmethod
+    def _encode(requests: list) -> list:
+        # the reports of every request, or the exception it raised
+        try:
+            reports = metar.encode_many([o for observations in requests for o in observations])
+        except Exception:
+            # one bad request must not fail the others: encode them one by one
+            results = []
+            for observations in requests:
+                try:
+                    results.append(metar.encode_many(observations))
+                except Exception as e:
+                    results.append(e)
+            return results
+        results, start = [], 0
+        for observations in requests:
+            results.append(reports[start:start + len(observations)])
+            start += len(observations)
+        return results
+
+
+class EncodeServer():
+    # Headless encoder over HTTP/1.1 (keep-alive), on TCP or a Unix socket:
+    #   POST /encode  {get_report_from_gui arguments}      -> {"report": "..."}
+    #   POST /encode  [{...}, {...}]                        -> {"reports": ["...", "..."]}
+    #   GET  /stats                                         -> {"batches": .., "encoded": ..}
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: Optional[str] = None,
+                 max_batch: int = MAX_BATCH, max_delay_ms: float = MAX_DELAY_MS, silence: bool = False) -> None:
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.batcher = MicroBatcher(max_batch, max_delay_ms)
+        self.cl = CLOG(processName="SERVER", timed=True, silence=silence)
+
+    async def serve_forever(self) -> None:
+        batcher = asyncio.create_task(self.batcher.run())
+        await asyncio.sleep(0)      # the batcher creates its queue before the first request
+        if self.unix_path:
+            server = await asyncio.start_unix_server(self.handle, path=self.unix_path)
+            self.cl.log(f"listening on {self.unix_path}")
+        else:
+            server = await asyncio.start_server(self.handle, self.host, self.port)
+            self.cl.log(f"listening on http://{self.host}:{self.port}")
+        serving = asyncio.create_task(server.serve_forever())
+        try:
+            # a dead batcher would leave every request waiting: stop the server with its error instead
+            done, _ = await asyncio.wait({batcher, serving}, return_when=asyncio.FIRST_COMPLETED)
+            if batcher in done and not batcher.cancelled() and batcher.exception() is not None:
+                self.cl.error("batcher stopped: %r", batcher.exception())
+                raise batcher.exception()
+        finally:
+            serving.cancel()
+            batcher.cancel()
+            server.close()
+            await server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode("latin-1").split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self.route(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: bytes):
+        if method == "GET" and path == "/stats":
+            return "200 OK", {"batches": self.batcher.batches, "encoded": self.batcher.encoded}
+        if method != "POST" or path != "/encode":
+            return "404 Not Found", {"error": f"{method} {path} not found"}
+        try:
+            request = json.loads(body)
+            if isinstance(request, list):
+                return "200 OK", {"reports": await self.batcher.encode(request)}
+            return "200 OK", {"report": (await self.batcher.encode([request]))[0]}
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            return "400 Bad Request", {"error": str(e)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless METAR encoder with request micro-batching")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="1 disables batching")
+    parser.add_argument('--max-delay-ms', type=float, default=MAX_DELAY_MS)
+    args = parser.parse_args()
+    try:
+        asyncio.run(EncodeServer(args.host, args.port, args.unix, args.max_batch, args.max_delay_ms).serve_forever())
+    except KeyboardInterrupt:
+        pass
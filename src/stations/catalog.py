@@ -0,0 +1,76 @@
+import os
+from typing import NamedTuple, Optional
+
+STATIONS_FILENAME = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "config", "stations.yaml")
+
+def qnh_correction(altitude: float) -> int:
+    # hPa added to the QFE, as AirPressure computes it: 3.3 ft per meter, 30 ft per hPa
+    return round(altitude*3.3/30)
+
+class StationInfo(NamedTuple):
+    identifier: str
+    name: str
+    altitude: Optional[int]             # in meters
+    latitude: Optional[float]           # in degrees
+    longitude: Optional[float]          # in degrees
+    qnh_correction: Optional[int]       # in hPa, precomputed from the altitude
+
+
+class StationCatalog():
+    # The stations of config/stations.yaml, looked up by identifier (dict).
+    # Per-station constants are computed once here instead of once per report.
+    def __init__(self, stations: dict) -> None:
+        self.stations = {}
+        for identifier, info in stations.items():
+            info = info or {}
+            altitude = info.get("altitude")
+            self.stations[identifier] = StationInfo(identifier, info.get("name") or "", altitude,
+                                                    info.get("latitude"), info.get("longitude"),
+                                                    None if altitude is None else qnh_correction(altitude))
+
+    @classmethod
+    def load(cls, path: str = STATIONS_FILENAME) -> "StationCatalog":
+        import yaml
+        with open(path, encoding="utf-8") as f:
+            return cls(yaml.safe_load(f)["stations"])
+
+    def __contains__(self, identifier) -> bool:
+        return identifier in self.stations
+
+    def __getitem__(self, identifier: str) -> StationInfo:
+        return self.stations[identifier]
+
+    def get(self, identifier: str, default=None) -> Optional[StationInfo]:
+        return self.stations.get(identifier, default)
+
+    def __iter__(self):
+        return iter(self.stations.values())
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def identifiers(self) -> list:
+        return list(self.stations)
+
+    def altitude(self, identifier: str) -> Optional[int]:
+        station = self.stations.get(identifier)
+        return None if station is None else station.altitude
+
+    def constant_columns(self, identifiers):
+        # (altitude, qnh_correction) float columns for a column of identifiers, NaN for unknown stations.
+        # Looked up once per distinct station and gathered, not once per report.
+        import numpy as np
+        unique, inverse = np.unique(np.asarray(identifiers, dtype=str), return_inverse=True)
+        altitude = np.array([np.nan if self.altitude(s) is None else self.altitude(s) for s in unique], dtype=np.float64)
+        correction = np.array([np.nan if self.altitude(s) is None else self.stations[s].qnh_correction for s in unique], dtype=np.float64)
+        return altitude[inverse.reshape(-1)], correction[inverse.reshape(-1)]
+
+
+_catalog = None
+
+def station_catalog() -> StationCatalog:
+    # the default catalog, loaded on first use
+    global _catalog
+    if _catalog is None:
+        _catalog = StationCatalog.load()
+    return _catalog
@@ -0,0 +1,87 @@
+import array
+import time
+
+try:
+    import miniaudio
+except ImportError:         # optional, sound.Sound falls back to playsound
+    miniaudio = None
+
+SAMPLE_RATE = 44100
+N_CHANNELS = 2
+BUFFER_MS = 20
+
+class PCMPlayer():
+    # Decodes a sound file once into an in-memory PCM buffer and plays it through a
+    # device that keeps running (silence when idle), so play() only moves a read position
+    # and returns immediately. Triggers that arrive while the sound is still playing are
+    # coalesced into the current playback. null_sink=True plays into miniaudio's NULL
+    # backend, which consumes samples in real time without any audio hardware.
+    # on_finished() is called from the device thread when a playback ends.
+    def __init__(self, path: str, null_sink: bool = False, buffer_ms: int = BUFFER_MS, on_finished=None) -> None:
+        if miniaudio is None:
+            raise ImportError("miniaudio is required for pre-decoded playback")
+        decoded = miniaudio.decode_file(path, output_format=miniaudio.SampleFormat.SIGNED16,
+                                        nchannels=N_CHANNELS, sample_rate=SAMPLE_RATE)
+        self.samples = decoded.samples
+        self.duration = decoded.duration
+        self.triggered = 0
+        self.coalesced = 0
+        self.latencies = []         # seconds from play() to the first samples handed to the device
+        self.on_finished = on_finished
+        self._position = None       # None when idle
+        self._requested_at = None
+        self._silence = array.array("h")
+        self.device = miniaudio.PlaybackDevice(output_format=miniaudio.SampleFormat.SIGNED16,
+                                               nchannels=N_CHANNELS, sample_rate=SAMPLE_RATE,
+                                               buffersize_msec=buffer_ms,
+                                               backends=[miniaudio.Backend.NULL] if null_sink else None)
+        stream = self._stream()
+        next(stream)
+        self.device.start(stream)
+
+    @property
+    def playing(self) -> bool:
+        return self._position is not None
+
+    def play(self) -> bool:
+        # never blocks; returns False when the trigger was coalesced into the current playback
+        self.triggered += 1
+        if self._position is not None:
+            self.coalesced += 1
+            return False
+        self._requested_at = time.monotonic()
+        self._position = 0
+        return True
+
+    def wait(self, timeout: float = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._position is not None and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.005)
+
+    def close(self) -> None:
+        # call before the process exits: a running device stopped from miniaudio's __del__
+        # during garbage collection can deadlock with its own callback thread
+        self.device.close()
+
+    def _stream(self):
+        # miniaudio sends the number of frames it needs and expects that many samples back
+        required_frames = yield b""
+        while True:
+            n = required_frames * N_CHANNELS
+            if len(self._silence) < n:
+                self._silence = array.array("h", bytes(2*n))
+            position = self._position
+            if position is None:
+                chunk = self._silence[:n]
+            else:
+                if position == 0:
+                    self.latencies.append(time.monotonic() - self._requested_at)
+                chunk = self.samples[position:position+n]
+                if position + n >= len(self.samples):
+                    chunk += self._silence[:n-len(chunk)]
+                    self._position = None
+                    if self.on_finished is not None:
+                        self.on_finished()
+                else:
+                    self._position = position + n
+            required_frames = yield chunk
@@ -1,15 +1,113 @@
+import sys
+import json
+import time
+import queue
+import threading
 from datetime import datetime
 
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+_STOP = None
+
 class CLOG():
-    def __init__(self, processName, timed = False, silence = False) -> None:
+    # Prints "[HH:MM:SS] __PROCESS__ msg" in the calling process, or, once a log queue is
+    # attached (attachLogQueue), only puts (monotonic time, process, level, msg, args) on it and
+    # a LogListener in another thread/process formats and writes them.
+    # Messages below `level` return before any formatting: pass the arguments separately,
+    # cl.debug("decoded %d reports", n), so that nothing is formatted for a discarded message.
+    queue = None    # shared by every CLOG of the process
+
+    def __init__(self, processName, timed = False, silence = False, level = INFO) -> None:
         self.processName = processName
         self.silence = silence
         self.timed = timed
+        self.level = level
+
+    def isEnabledFor(self, level) -> bool:
+        return not self.silence and level >= self.level
+
+    def log(self, msg, *args, level = INFO):
+        if self.silence or level < self.level:
+            return
+        if CLOG.queue is not None:
+            CLOG.queue.put((time.monotonic(), self.processName, level, msg, args))
+            return
+        if args:
+            msg = msg % args
+        if self.timed:
+            _time = datetime.now().strftime("%H:%M:%S")
+            print(f"[{_time}] __{self.processName}__ {msg}")
+        else:
+            print(f"__{self.processName}__ {msg}")
+
+    def debug(self, msg, *args):
+        self.log(msg, *args, level=DEBUG)
+
+    def info(self, msg, *args):
+        self.log(msg, *args, level=INFO)
+
+    def warning(self, msg, *args):
+        self.log(msg, *args, level=WARNING)
+
+    def error(self, msg, *args):
+        self.log(msg, *args, level=ERROR)
+
+
+def attachLogQueue(logQueue) -> None:
+    # every CLOG of this process logs through logQueue from now on (None goes back to printing)
+    CLOG.queue = logQueue
+
+def logRecord(t, processName, level, msg, args) -> str:
+    # one JSON line per record
+    msg = str(msg)
+    if args:
+        try:
+            msg = msg % args
+        except (TypeError, ValueError):
+            msg = " ".join([msg] + [str(a) for a in args])
+    return json.dumps({"t": round(t, 6), "process": processName, "level": LEVEL_NAMES.get(level, str(level)), "msg": msg})
+
+
+class LogListener():
+    # Single writer for the records of every process: takes them off the queue in a
+    # background thread and writes them as JSON lines, a batch of up to batch_size
+    # records at a time (or after flush_interval_ms), to `path` or to stdout.
+    def __init__(self, logQueue, path = None, batch_size = 256, flush_interval_ms = 100) -> None:
+        self.queue = logQueue
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.written = 0
+        self._thread = threading.Thread(target=self._run, name="LogListener", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout = None) -> None:
+        # writes everything still queued, then stops the thread
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
 
-    def log(self, msg):
-        if not self.silence:
-            if self.timed:
-                _time = datetime.now().strftime("%H:%M:%S")
-                print(f"[{_time}] __{self.processName}__ {msg}")
-            else:
-                print(f"__{self.processName}__ {msg}")
\ No newline at end of file
+    def _run(self) -> None:
+        out = open(self.path, "a", encoding="utf-8") if self.path else sys.stdout
+        try:
+            stopping = False
+            while not stopping:
+                batch = [self.queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                if _STOP in batch:
+                    stopping = True
+                    batch = [record for record in batch if record is not _STOP]
+                out.write("".join(logRecord(*record) + "\n" for record in batch))
+                out.flush()
+                self.written += len(batch)
+        finally:
+            if self.path:
+                out.close()
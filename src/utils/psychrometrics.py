@@ -0,0 +1,55 @@
+import math
+
+# Array functions import numpy lazily: the scalar helpers below are used by every GUI report
+
+# Magnus formula coefficients (hPa, degrees Celsius) and psychrometer constant
+MAGNUS_A = 6.108
+MAGNUS_B = 17.27
+MAGNUS_C = 237.3
+PSYCHROMETER_CONSTANT = 0.00066
+
+def saturated_vapor_pressure(temperature):
+    import numpy as np
+    temperature = np.asarray(temperature, dtype=np.float64)
+    return MAGNUS_A*np.exp(MAGNUS_B*temperature/(MAGNUS_C+temperature))
+
+def vapor_pressure(dry_temperature, wet_temperature, air_pressure):
+    import numpy as np
+    dry_temperature = np.asarray(dry_temperature, dtype=np.float64)
+    wet_temperature = np.asarray(wet_temperature, dtype=np.float64)
+    return saturated_vapor_pressure(wet_temperature) - PSYCHROMETER_CONSTANT*(1+0.00115*wet_temperature)*(dry_temperature-wet_temperature)*air_pressure
+
+def dew_point(dry_temperature, wet_temperature, air_pressure):
+    import numpy as np
+    # NaN wherever the vapour pressure is not positive (wet bulb too far below the dry bulb)
+    e = vapor_pressure(dry_temperature, wet_temperature, air_pressure)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.log(np.where(e > 0, e, np.nan)/MAGNUS_A)/MAGNUS_B
+        return MAGNUS_C*z/(1-z)
+
+def relative_humidity(dry_temperature, wet_temperature, air_pressure):
+    import numpy as np
+    # in percent, NaN where the dew point is undefined
+    e = vapor_pressure(dry_temperature, wet_temperature, air_pressure)
+    return np.where(e > 0, 100*e/saturated_vapor_pressure(dry_temperature), np.nan)
+
+# Same formulas on plain floats, for encoding a single report without NumPy scalar overhead
+
+def scalar_saturated_vapor_pressure(temperature: float) -> float:
+    return MAGNUS_A*math.exp(MAGNUS_B*temperature/(MAGNUS_C+temperature))
+
+def scalar_vapor_pressure(dry_temperature: float, wet_temperature: float, air_pressure: float) -> float:
+    return scalar_saturated_vapor_pressure(wet_temperature) - PSYCHROMETER_CONSTANT*(1+0.00115*wet_temperature)*(dry_temperature-wet_temperature)*air_pressure
+
+def scalar_dew_point(dry_temperature: float, wet_temperature: float, air_pressure: float) -> float:
+    e = scalar_vapor_pressure(dry_temperature, wet_temperature, air_pressure)
+    if e <= 0:
+        return math.nan
+    z = math.log(e/MAGNUS_A)/MAGNUS_B
+    return MAGNUS_C*z/(1-z)
+
+def scalar_relative_humidity(dry_temperature: float, wet_temperature: float, air_pressure: float) -> float:
+    e = scalar_vapor_pressure(dry_temperature, wet_temperature, air_pressure)
+    if e <= 0:
+        return math.nan
+    return 100*e/scalar_saturated_vapor_pressure(dry_temperature)
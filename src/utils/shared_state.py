@@ -0,0 +1,75 @@
+import struct
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+# A fixed-layout state block in shared memory, used like the Manager dicts it replaces:
+#   state = SharedState({'shutdown': bool, 'metarReport': (str, 512)})
+#   state['shutdown'] = True
+# Flags are single bytes; strings are a 4-byte length followed by a bounded utf-8 buffer
+# and are read and written under a lock. The block is passed to child processes as a
+# Process argument; only the creating process unlinks it.
+
+_LENGTH = struct.Struct("<I")
+
+class SharedState():
+    def __init__(self, layout: dict, lock=None) -> None:
+        self.layout = dict(layout)
+        self._offsets = {}
+        size = 0
+        for key, kind in self.layout.items():
+            self._offsets[key] = size
+            if kind is bool:
+                size += 1
+            elif isinstance(kind, tuple) and kind[0] is str:
+                size += _LENGTH.size + kind[1]
+            else:
+                raise Exception(str(kind) + " is not a Valid Shared State Type (bool, (str, max_bytes))!")
+        self.size = size
+        self.lock = lock or mp.Lock()
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._shm.buf[:size] = bytes(size)
+        self._owner = True
+
+    def __getstate__(self):
+        return {"layout": self.layout, "offsets": self._offsets, "size": self.size, "lock": self.lock, "name": self._shm.name}
+
+    def __setstate__(self, state) -> None:
+        self.layout = state["layout"]
+        self._offsets = state["offsets"]
+        self.size = state["size"]
+        self.lock = state["lock"]
+        # child processes share the parent's resource tracker, which unlinks the block if the parent dies without close()
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+
+    def __getitem__(self, key: str):
+        kind, offset = self.layout[key], self._offsets[key]
+        buf = self._shm.buf
+        if kind is bool:
+            return buf[offset] != 0
+        with self.lock:
+            length, = _LENGTH.unpack_from(buf, offset)
+            start = offset + _LENGTH.size
+            return bytes(buf[start:start+length]).decode()
+
+    def __setitem__(self, key: str, value) -> None:
+        kind, offset = self.layout[key], self._offsets[key]
+        buf = self._shm.buf
+        if kind is bool:
+            buf[offset] = 1 if value else 0
+            return
+        data = value.encode()
+        if len(data) > kind[1]:
+            raise ValueError(f"{key} does not fit in {kind[1]} bytes of shared state!")
+        with self.lock:
+            _LENGTH.pack_into(buf, offset, len(data))
+            start = offset + _LENGTH.size
+            buf[start:start+len(data)] = data
+
+    def keys(self):
+        return self.layout.keys()
+
+    def close(self) -> None:
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
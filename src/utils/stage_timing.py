@@ -0,0 +1,104 @@
+from time import perf_counter_ns
+
+SUB_BUCKETS = 4     # buckets per power of two, percentiles are within 25% of the true duration
+N_BUCKETS = 40 * SUB_BUCKETS   # in nanoseconds, the last bucket holds everything from ~550 s up
+
+def bucket_index(ns: int) -> int:
+    # the top three bits of ns: its power of two and which quarter of it
+    e = ns.bit_length()
+    if e <= 3:
+        return ns
+    return min(e * SUB_BUCKETS + ((ns >> (e - 3)) & 3), N_BUCKETS - 1)
+
+def bucket_upper_edge(i: int) -> int:
+    if i < 4 * SUB_BUCKETS:
+        return i + 1
+    e, quarter = divmod(i, SUB_BUCKETS)
+    return (4 + quarter + 1) << (e - 3)
+
+class StageHistogram():
+    # durations of one stage: count, total, min, max and a log2 histogram for the percentiles
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = [0] * N_BUCKETS
+
+    def add(self, ns: int) -> None:
+        self.count += 1
+        self.total_ns += ns
+        if self.min_ns is None or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[bucket_index(ns)] += 1
+
+    def percentile(self, q: float) -> int:
+        # upper edge of the bucket holding the q-th percentile, clamped to the max
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(bucket_upper_edge(i), self.max_ns)
+        return self.max_ns
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count,
+                "total_ms": self.total_ns / 1e6,
+                "mean_us": self.total_ns / self.count / 1e3,
+                "min_us": self.min_ns / 1e3,
+                "p50_us": self.percentile(50) / 1e3,
+                "p90_us": self.percentile(90) / 1e3,
+                "p99_us": self.percentile(99) / 1e3,
+                "max_us": self.max_ns / 1e3}
+
+
+class StageTimings():
+    # in-process registry of per-stage durations, disabled by default.
+    # Instrumented code reads `enabled` once and only calls lap() when it is set:
+    #
+    #   timings = STAGE_TIMINGS if STAGE_TIMINGS.enabled else None
+    #   if timings: t = timings.start()
+    #   ...stage...
+    #   if timings: t = timings.lap("stage", t)
+    def __init__(self) -> None:
+        self.enabled = False
+        self.stages = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        self.stages = {}
+
+    def start(self) -> int:
+        return perf_counter_ns()
+
+    def lap(self, stage: str, start_ns: int) -> int:
+        # records the time since start_ns under `stage` and returns now, the start of the next stage
+        now = perf_counter_ns()
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = StageHistogram()
+        histogram.add(now - start_ns)
+        return now
+
+    def summary(self) -> dict:
+        return {stage: histogram.summary() for stage, histogram in self.stages.items()}
+
+    def log(self, cl) -> None:
+        # one line per stage through a CLOG
+        for stage, s in self.summary().items():
+            if s["count"]:
+                cl.log(f"{stage:<12} {s['count']:>8} calls, mean {s['mean_us']:8.2f} us, p50 {s['p50_us']:8.2f} us, "
+                       f"p99 {s['p99_us']:8.2f} us, max {s['max_us']:8.2f} us")
+
+
+STAGE_TIMINGS = StageTimings()